@@ -7,6 +7,8 @@ from sqlalchemy.ext.declarative import declarative_base
 import pymysql
 # Carga variables de entorno desde el archivo .env
 from dotenv import load_dotenv
+import itertools
+import threading
 import os
 
 # Carga las variables de entorno al entorno de ejecución
@@ -38,17 +40,50 @@ def create_database_if_not_exists():
     finally:
         connection.close()
 
-# Ejecuta la función para asegurarse de que la base de datos exista
-create_database_if_not_exists()
+# URL completa opcional del primario (por ejemplo sqlite:///primary.db para pruebas locales)
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Lista opcional de URLs de réplicas de solo lectura separadas por comas
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
 
-# Construye la URL de conexión para SQLAlchemy usando pymysql como driver
-SQLALCHEMY_DATABASE_URL = (
-    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
+if DATABASE_URL:
+    SQLALCHEMY_DATABASE_URL = DATABASE_URL
+else:
+    # Ejecuta la función para asegurarse de que la base de datos exista
+    create_database_if_not_exists()
+
+    # Construye la URL de conexión para SQLAlchemy usando pymysql como driver
+    SQLALCHEMY_DATABASE_URL = (
+        f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    )
 
 # Crea el motor de conexión de SQLAlchemy, que gestiona la conexión con la base de datos
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 # Crea una clase fábrica de sesiones para interactuar con la base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Motores y fábricas de sesiones para las réplicas de lectura (si hay configuradas)
+replica_engines = [create_engine(url) for url in DB_REPLICA_URLS]
+ReplicaSessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    for replica_engine in replica_engines
+]
+_replica_counter = itertools.count()
+_replica_lock = threading.Lock()
+
+# Función que devuelve una sesión de lectura repartiendo las réplicas en round-robin
+def ReplicaSessionLocal():
+    """
+    Crea una sesión sobre la siguiente réplica de lectura.
+    Si no hay réplicas configuradas, usa el primario.
+
+    Returns:
+        Session: Sesión de SQLAlchemy para consultas de solo lectura.
+    """
+    if not ReplicaSessions:
+        return SessionLocal()
+    with _replica_lock:
+        index = next(_replica_counter) % len(ReplicaSessions)
+    return ReplicaSessions[index]()
+
 # Base declarativa a partir de la cual se construirán los modelos ORM (tablas)
 Base = declarative_base()
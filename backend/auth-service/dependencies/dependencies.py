@@ -1,23 +1,92 @@
 # Generator para declarar el tipo de valor que retorna una función generadora
 from typing import Generator
 # Fábrica de sesiones desde la configuración de base de datos
-from database.database import SessionLocal
+from database.database import SessionLocal, ReplicaSessionLocal
 # Clase Session de SQLAlchemy para tipar correctamente
 from sqlalchemy.orm import Session
 # Depends para la inyección de dependencias en FastAPI
-from fastapi import Depends
+from fastapi import Depends, Request
 # Annotated permite combinar tipos con dependencias para una escritura más clara y moderna
 from typing import Annotated
+# Herramientas para la ventana de lectura-tras-escritura
+import threading
+import time
+import os
+
+# Segundos durante los que un cliente que escribió lee del primario
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Métodos HTTP que no modifican datos
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Momento hasta el que cada cliente debe leer del primario
+_recent_writers = {}
+_writers_lock = threading.Lock()
+
+# Identifica al cliente por su token (si lo envía) o por su dirección IP
+def client_key(request: Request) -> str:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else "anonymous"
+
+# Registra una escritura reciente asociada a la clave
+def _mark(key: str):
+    now = time.monotonic()
+    with _writers_lock:
+        _recent_writers[key] = now + READ_YOUR_WRITES_SECONDS
+        # Limpia las entradas vencidas para que el diccionario no crezca sin límite
+        if len(_recent_writers) > 1024:
+            for key in [key for key, until in _recent_writers.items() if until <= now]:
+                del _recent_writers[key]
+
+# Indica si hubo una escritura asociada a la clave dentro de la ventana
+def _written_recently(key: str) -> bool:
+    with _writers_lock:
+        until = _recent_writers.get(key)
+    return until is not None and until > time.monotonic()
+
+# Registra que el cliente acaba de escribir para fijar sus lecturas al primario
+def mark_write(request: Request):
+    _mark(client_key(request))
+
+# Indica si el cliente escribió dentro de la ventana de lectura-tras-escritura
+def wrote_recently(request: Request) -> bool:
+    return _written_recently(client_key(request))
+
+# Registra un username creado o modificado desde otro servicio (User Service):
+# la ventana del cliente no cubre al usuario final, así que se fija por username
+def mark_username_write(username: str):
+    _mark(f"username:{username}")
+
+# Indica si el username se creó o modificó dentro de la ventana de lectura-tras-escritura
+def username_written_recently(username: str) -> bool:
+    return _written_recently(f"username:{username}")
 
 # Función que provee una sesión de base de datos (SessionLocal) a través de una dependencia
 # Usa 'yield' para garantizar que la conexión se cierre después de su uso
-def get_db() -> Generator:
+def get_db(request: Request) -> Generator:
     db = SessionLocal()  # Crea una nueva sesión
+    writes = request.method not in SAFE_METHODS
+    if writes:
+        mark_write(request)  # Las lecturas siguientes del cliente irán al primario
     try:
         yield db          # La sesión se pasa al endpoint que la necesite
     finally:
         db.close()        # Cierra la sesión al finalizar la solicitud
+        if writes:
+            mark_write(request)  # La ventana empieza a contar desde el commit
+
+# Función que provee una sesión de solo lectura sobre una réplica (round-robin)
+# Si el cliente escribió hace poco, usa el primario para que vea sus propios cambios
+def get_read_db(request: Request) -> Generator:
+    db = SessionLocal() if wrote_recently(request) else ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 # db_dependency se define como una anotación reutilizable
 # Es una manera más limpia de usar la dependencia de base de datos en múltiples rutas
 db_dependency = Annotated[Session, Depends(get_db)]
+# read_db_dependency se usa en las rutas de solo lectura para enviarlas a las réplicas
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
@@ -0,0 +1,253 @@
+# Herramientas de logging con cola para escribir desde un hilo en segundo plano
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+# Carga variables de entorno desde el archivo .env
+from dotenv import load_dotenv
+# Span activo para añadir trace_id y span_id a cada registro
+from tracing.tracing import current_span
+import os
+
+# Carga las variables del archivo .env
+load_dotenv()
+
+# Configuración del logging desde variables de entorno
+LOG_ENABLED = os.getenv("LOG_ENABLED", "true").lower() not in ("0", "false", "no")  # Permite apagar los logs (para medir)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()                                 # Nivel mínimo de los registros
+LOG_FILE = os.getenv("LOG_FILE")                                                   # Archivo de salida (por defecto stdout)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))                         # Registros en cola antes de descartar
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "10"))                            # Repeticiones por mensaje e intervalo
+LOG_RATE_INTERVAL = float(os.getenv("LOG_RATE_INTERVAL", "10"))                    # Intervalo del límite (segundos)
+LOG_RATE_MAX_KEYS = int(os.getenv("LOG_RATE_MAX_KEYS", "1000"))                    # Mensajes distintos vigilados a la vez
+
+# ID de la petición en curso (se propaga también al pool de hilos)
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+# Atributos estándar de LogRecord que no se copian como campos extra
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class ContextFilter(logging.Filter):
+    """
+    Añade al registro el ID de la petición y la traza activa.
+    Se ejecuta en el hilo que genera el log, donde el contexto sigue disponible.
+    """
+
+    def __init__(self, service_name: str):
+        super().__init__()
+        self.service_name = service_name
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.service = self.service_name
+        record.request_id = request_id_var.get()
+        span = current_span()
+        record.trace_id = span.trace_id if span else None
+        record.span_id = span.span_id if span else None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita las repeticiones de un mismo mensaje (misma plantilla, logger y nivel)
+    a `limit` por `interval` segundos. Los descartados se cuentan y se informan
+    en el siguiente registro que pasa, en el campo `suppressed`.
+
+    Las ventanas se guardan ordenadas por inicio: las vencidas se eliminan al
+    filtrar y, si hay más de `max_keys` mensajes distintos, se descartan las más
+    antiguas. Los suprimidos de un mensaje que no vuelve a aparecer se pierden.
+    """
+
+    def __init__(
+        self,
+        limit: int = LOG_RATE_LIMIT,
+        interval: float = LOG_RATE_INTERVAL,
+        min_level: int = logging.WARNING,
+        max_keys: int = LOG_RATE_MAX_KEYS,
+        clock=time.monotonic,
+    ):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.min_level = min_level
+        self.max_keys = max_keys
+        self._clock = clock
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno < self.min_level:
+            return True
+        # La clave usa la plantilla sin formatear, por eso los logs deben usar %s y no f-strings
+        key = (record.name, record.levelno, str(record.msg))
+        now = self._clock()
+        with self._lock:
+            started, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, count = now, 0
+            if count >= self.limit:
+                self._windows[key] = (started, count, suppressed + 1)
+                return False
+            self._windows[key] = (started, count + 1, 0)
+            if count == 0:
+                # Ventana nueva: pasa al final para mantener el orden por inicio
+                self._windows.move_to_end(key)
+                self._prune(now)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _prune(self, now: float):
+        # Elimina desde el inicio las ventanas vencidas y las que exceden max_keys
+        while self._windows:
+            key, (started, _, _) = next(iter(self._windows.items()))
+            if now - started < self.interval and len(self._windows) <= self.max_keys:
+                break
+            del self._windows[key]
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que encola sin bloquear: si la cola está llena, el registro se
+    descarta. El mensaje se formatea en el hilo que genera el log y el hilo de
+    escritura solo serializa a JSON y escribe.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Los argumentos pueden ser objetos mutables o instancias ORM ligadas a una sesión
+        # de este hilo: se formatean aquí y al hilo de escritura solo llega el texto.
+        # Los filtros (incluido el límite por plantilla) ya se aplicaron sobre msg sin formatear.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # Las trazas de excepción también: el traceback no sobrevive al hilo
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatea cada registro como una línea JSON con campos estructurados.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+# Listener activo (se guarda para poder detenerlo y vaciar la cola al salir)
+_listener = None
+
+
+def setup_logging(service_name: str):
+    """
+    Configura el logging del servicio: los registros se encolan en el hilo de
+    la petición y un hilo en segundo plano los formatea como JSON y los escribe.
+
+    Args:
+        service_name (str): Nombre del servicio que se incluye en cada registro.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None:
+        return
+
+    if not LOG_ENABLED:
+        # Sin logs: se descarta todo antes de crear el registro
+        logging.disable(logging.CRITICAL)
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    queue_handler.addFilter(ContextFilter(service_name))
+
+    output = logging.FileHandler(LOG_FILE, encoding="utf-8") if LOG_FILE else logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # Los logs de uvicorn también pasan por la cola en lugar de escribir directamente
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Detiene el hilo de escritura después de vaciar los registros pendientes.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI que asigna un ID a cada petición (o reutiliza la cabecera
+    X-Request-ID recibida) y lo devuelve en la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
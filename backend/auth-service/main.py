@@ -1,18 +1,40 @@
 # Clase principal de FastAPI para crear la aplicación
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import os
 # Motor de base de datos SQLAlchemy configurado en database.py
-from database.database import engine
+from database.database import engine, replica_engines
 # Modelos del módulo de usuarios para crear las tablas en la base de datos
 import models.models as UserModel
 # Routers definidos para usuarios, autenticación y websockets
-from routers.routers import auth_router
+from routers.routers import auth_router, reconcile_router
 # Dependencia para obtener la sesión de base de datos
 from dependencies.dependencies import db_dependency
+# Middleware de límites de concurrencia y descarte de carga
+from middleware.load_shedding import (
+    LoadSheddingMiddleware,
+    RouteLimit,
+    PRIORITY_CRITICAL,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    get_limiter_states,
+)
+# Middleware de compresión negociada (zstd, brotli o gzip)
+from middleware.compression import CompressionMiddleware, get_compression_stats
+# Trazado distribuido (span por petición, sentencias SQL y bcrypt)
+from tracing.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+# Logging estructurado con cola y escritura en segundo plano
+from logs.logs import RequestIdMiddleware, setup_logging, shutdown_logging
 
 # Crea la instancia principal de la aplicación FastAPI
 app = FastAPI()
 
+# Configura el logging JSON con cola antes de atender peticiones
+setup_logging("auth-service")
+
+# Configura el trazado e instrumenta el primario y las réplicas
+configure_tracing("auth-service", engines=[engine, *replica_engines])
+
 # Crea todas las tablas definidas en los modelos (si no existen ya en la base de datos)
 UserModel.Base.metadata.create_all(bind=engine)
 
@@ -25,6 +47,22 @@ origins = [
     "http://localhost:3000",
 ]
 
+# Compresión de respuestas con el nivel y tamaño mínimo por defecto
+app.add_middleware(CompressionMiddleware)
+
+# Límites de concurrencia: los health checks nunca se limitan y el login tiene
+# prioridad alta con un límite propio (bcrypt consume CPU en el pool de hilos).
+# La conciliación recorre la tabla login completa: prioridad baja y de a una.
+# Se registra antes que CORS para que las respuestas 503 lleven las cabeceras CORS.
+app.add_middleware(
+    LoadSheddingMiddleware,
+    routes=[
+        RouteLimit("GET", r"/|/health(/.*)?", priority=PRIORITY_CRITICAL),
+        RouteLimit("POST", r"/login", priority=PRIORITY_HIGH, limit=int(os.getenv("LOGIN_CONCURRENCY", "8"))),
+        RouteLimit("*", r"/reconcile(/.*)?", priority=PRIORITY_LOW, limit=int(os.getenv("RECONCILE_CONCURRENCY", "1"))),
+    ],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -33,8 +71,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ID de petición para correlacionar los logs (se incluye en cada registro)
+app.add_middleware(RequestIdMiddleware)
+
+# Trazado: se registra al final para que sea el middleware más externo y
+# también mida las respuestas 503 del descarte de carga
+app.add_middleware(TracingMiddleware)
+
 # Registra el router del módulo de usuarios y de autenticación con la aplicación principal
 app.include_router(auth_router)
+app.include_router(reconcile_router)
 
 # Asigna explícitamente la dependencia de la base de datos (no es necesario si no se usa aquí)
 db_dependency = db_dependency
@@ -45,4 +91,15 @@ async def root():
 
 @app.get("/health", tags=["Health"])
 async def health():
-    return {"status": "healthy", "service": "fastapi-api"}
\ No newline at end of file
+    return {"status": "healthy", "service": "fastapi-api"}
+
+@app.get("/health/dependencies", tags=["Health"])
+async def health_dependencies():
+    # Expone el estado de los limitadores de concurrencia y las métricas de compresión
+    return {"limiters": get_limiter_states(), "compression": get_compression_stats()}
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Exporta los spans pendientes y vacía la cola de logs antes de apagar el servicio
+    shutdown_tracing()
+    shutdown_logging()
@@ -0,0 +1,347 @@
+# Expresiones regulares para asociar rutas con su nivel de compresión
+import re
+import time
+# zlib viene con Python y se usa para gzip
+import zlib
+from typing import List, Optional
+# Carga variables de entorno desde el archivo .env
+from dotenv import load_dotenv
+import os
+
+# brotli y zstandard son opcionales: si no están instalados no se ofrecen
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Carga las variables del archivo .env
+load_dotenv()
+
+# Configuración por defecto de la compresión desde variables de entorno
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))  # Bytes mínimos para comprimir
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "5"))                   # Nivel por defecto (1 = rápido, 9 = máximo)
+
+# Tipos de contenido que vale la pena comprimir
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "application/xml")
+
+
+class CompressionRule:
+    """
+    Regla que asigna un nivel de compresión (presupuesto de CPU) a una ruta.
+
+    Args:
+        path (str): Expresión regular que debe coincidir con la ruta completa.
+        level (int): Nivel de 1 (rápido) a 9 (máximo); 0 desactiva la compresión.
+        minimum_size (int, opcional): Tamaño mínimo propio para esta ruta.
+    """
+
+    def __init__(self, path: str, level: int = COMPRESSION_LEVEL, minimum_size: Optional[int] = None):
+        self.pattern = re.compile(path)
+        self.level = level
+        self.minimum_size = minimum_size
+
+    def matches(self, path: str) -> bool:
+        return self.pattern.fullmatch(path) is not None
+
+
+class _Encoder:
+    """
+    Compresor incremental para una codificación concreta.
+    El nivel genérico (1-9) se traduce a la escala de cada algoritmo.
+    """
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "zstd":
+            # zstd admite niveles de 1 a 22; los niveles altos son demasiado caros por petición
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == "br":
+            # brotli admite calidades de 0 a 11
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            # wbits=31 genera el formato gzip (cabecera y CRC)
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Vacía lo pendiente sin cerrar el flujo (para respuestas por partes)
+        if self.encoding == "zstd":
+            return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        # Cierra el flujo comprimido
+        if self.encoding == "zstd":
+            return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def supported_encodings() -> List[str]:
+    """
+    Devuelve las codificaciones disponibles en orden de preferencia del servidor.
+    """
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la codificación según la cabecera Accept-Encoding del cliente.
+
+    Args:
+        accept_encoding (str): Valor de la cabecera Accept-Encoding.
+
+    Returns:
+        str | None: Codificación elegida o None si el cliente no acepta ninguna.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        # Ante el mismo peso se respeta el orden de preferencia del servidor
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime las respuestas con zstd, brotli o gzip según
+    lo que acepte el cliente. Las respuestas completas menores que el tamaño
+    mínimo se envían sin comprimir y las respuestas por partes se comprimen
+    de forma incremental.
+    """
+
+    def __init__(
+        self,
+        app,
+        rules: Optional[List[CompressionRule]] = None,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        level: int = COMPRESSION_LEVEL,
+    ):
+        self.app = app
+        self.rules = rules or []
+        self.minimum_size = minimum_size
+        self.level = level
+        # Métricas acumuladas para medir bytes ahorrados y CPU usada
+        self.stats = {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+        compressors.append(self)
+
+    def _settings(self, path: str):
+        # Devuelve el nivel y tamaño mínimo de la primera regla que coincide
+        for rule in self.rules:
+            if rule.matches(path):
+                minimum = rule.minimum_size if rule.minimum_size is not None else self.minimum_size
+                return rule.level, minimum
+        return self.level, self.minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        level, minimum_size = self._settings(scope["path"])
+        accept_encoding = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        if level <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            # Este cliente no acepta ninguna codificación, pero otro sí: la respuesta varía
+            await self.app(scope, receive, _vary_sender(send))
+            return
+
+        responder = _CompressionResponder(self, send, encoding, level, minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+def _compressible(message) -> bool:
+    """
+    Indica si un inicio de respuesta tiene cuerpo, tipo comprimible y aún no está codificado.
+    """
+    if message["status"] < 200 or message["status"] in (204, 304):
+        return False
+    content_type = b""
+    for key, value in message.get("headers", []):
+        if key == b"content-encoding":
+            return False
+        if key == b"content-type":
+            content_type = value
+    return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+
+
+def _vary_sender(send):
+    """
+    Envuelve send para añadir Vary: Accept-Encoding a las respuestas comprimibles
+    que se envían sin comprimir.
+    """
+    async def send_with_vary(message):
+        if message["type"] == "http.response.start" and _compressible(message):
+            message = {**message, "headers": _vary_accept_encoding(message.get("headers", []))}
+        await send(message)
+
+    return send_with_vary
+
+
+def _vary_accept_encoding(headers) -> list:
+    """
+    Añade Accept-Encoding a la cabecera Vary conservando los valores que ya tenga.
+    """
+    headers = list(headers)
+    tokens = set()
+    for key, value in headers:
+        if key == b"vary":
+            tokens.update(token.strip().lower() for token in value.decode("latin-1").split(","))
+    if "accept-encoding" in tokens or "*" in tokens:
+        return headers
+    for index, (key, value) in enumerate(headers):
+        if key == b"vary":
+            headers[index] = (key, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class _CompressionResponder:
+    """
+    Intercepta los mensajes de respuesta de una petición y decide si comprimirlos.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str, level: int, minimum_size: int):
+        self.middleware = middleware
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.encoder = None
+        self.started = False
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            # Se retiene el inicio hasta conocer el primer fragmento del cuerpo
+            self.start_message = message
+            if not _compressible(message):
+                self.passthrough = True
+                await self._send(message)
+            elif self._below_minimum(message):
+                # Demasiado pequeña, pero la misma ruta puede responder comprimida otras veces
+                self.passthrough = True
+                await self._send(self._start_with_vary())
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.minimum_size:
+                # Respuesta completa y pequeña: comprimir no compensa
+                self.passthrough = True
+                await self._send(self._start_with_vary())
+                await self._send(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.level)
+            self.middleware.stats["responses"] += 1
+
+        # thread_time mide solo la CPU de este hilo: no cuenta esperas ni otros hilos
+        started = time.thread_time()
+        chunk = self.encoder.compress(body)
+        chunk += self.encoder.flush() if more_body else self.encoder.finish()
+        self._record(len(body), len(chunk), time.thread_time() - started)
+
+        if not self.started:
+            # Respuesta completa: se conoce el tamaño final; por partes: se omite
+            self.started = True
+            await self._send_start(None if more_body else len(chunk))
+
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _below_minimum(self, message) -> bool:
+        # Indica si la respuesta declara un tamaño menor que el mínimo para comprimir
+        for key, value in message.get("headers", []):
+            if key == b"content-length":
+                return int(value) < self.minimum_size
+        return False
+
+    def _start_with_vary(self):
+        # Inicio de respuesta sin comprimir con Vary: Accept-Encoding añadido
+        return {**self.start_message, "headers": _vary_accept_encoding(self.start_message.get("headers", []))}
+
+    async def _send_start(self, content_length: Optional[int]):
+        # Ajusta las cabeceras y envía el inicio de la respuesta comprimida
+        headers = _vary_accept_encoding(
+            (key, value)
+            for key, value in self.start_message.get("headers", [])
+            if key != b"content-length"
+        )
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode("latin-1")))
+        await self._send({**self.start_message, "headers": headers})
+
+    def _record(self, bytes_in: int, bytes_out: int, seconds: float):
+        # Acumula las métricas de la respuesta en el middleware
+        stats = self.middleware.stats
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+        stats["cpu_seconds"] += seconds
+
+
+# Registro de middlewares creados para poder exponer sus métricas
+compressors: List[CompressionMiddleware] = []
+
+
+def get_compression_stats() -> List[dict]:
+    """
+    Devuelve las métricas de compresión (bytes ahorrados y tiempo de CPU).
+    """
+    results = []
+    for middleware in compressors:
+        stats = dict(middleware.stats)
+        stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+        stats["cpu_seconds"] = round(stats["cpu_seconds"], 6)
+        results.append(stats)
+    return results
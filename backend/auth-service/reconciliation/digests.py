@@ -0,0 +1,102 @@
+# blake2b para calcular resúmenes compactos de rangos de filas
+import hashlib
+from typing import List, Sequence, Tuple
+# Clase Session de SQLAlchemy para tipar correctamente
+from sqlalchemy.orm import Session
+
+# Filas que se leen por lote al recorrer un rango grande
+READ_BATCH_SIZE = 5000
+
+
+def fingerprint(row_id: int, username: str, password: str, is_active: bool) -> bytes:
+    """
+    Representa una fila como bytes estables para calcular su resumen.
+    Ambos servicios deben usar exactamente esta misma función.
+    """
+    return f"{row_id}\x1f{username or ''}\x1f{password or ''}\x1f{int(bool(is_active))}\x1e".encode("utf-8")
+
+
+def split_range(start: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Divide el rango de IDs [start, end) en hasta `parts` subrangos contiguos.
+
+    Args:
+        start (int): Primer ID incluido.
+        end (int): Primer ID excluido.
+        parts (int): Número máximo de subrangos.
+
+    Returns:
+        list[tuple[int, int]]: Subrangos [inicio, fin) ordenados.
+
+    Raises:
+        ValueError: Si parts es menor que 1.
+    """
+    if parts < 1:
+        raise ValueError(f"parts debe ser al menos 1 (recibido {parts})")
+    size = max((end - start + parts - 1) // parts, 1)
+    return [(low, min(low + size, end)) for low in range(start, end, size)]
+
+
+def range_digests(db: Session, model, ranges: Sequence[Sequence[int]]) -> List[str]:
+    """
+    Calcula el resumen (username, hash de contraseña, is_active) de cada rango de IDs.
+
+    Los rangos deben venir ordenados y sin solaparse; se resuelven todos con una
+    sola consulta ordenada por ID que se recorre por lotes.
+
+    Args:
+        db (Session): Sesión de base de datos.
+        model: Modelo ORM con columnas id, username, password e is_active.
+        ranges (list): Rangos [inicio, fin) a resumir.
+
+    Returns:
+        list[str]: Resumen hexadecimal de cada rango, en el mismo orden.
+    """
+    hashers = [hashlib.blake2b(digest_size=16) for _ in ranges]
+    if not ranges:
+        return []
+
+    rows = (
+        db.query(model.id, model.username, model.password, model.is_active)
+        .filter(model.id >= ranges[0][0], model.id < ranges[-1][1])
+        .order_by(model.id)
+        .yield_per(READ_BATCH_SIZE)
+    )
+
+    index = 0
+    for row_id, username, password, is_active in rows:
+        # Avanza hasta el rango que contiene el ID (las filas entre rangos se ignoran)
+        while index < len(ranges) and row_id >= ranges[index][1]:
+            index += 1
+        if index == len(ranges):
+            break
+        if row_id >= ranges[index][0]:
+            hashers[index].update(fingerprint(row_id, username, password, is_active))
+
+    return [hasher.hexdigest() for hasher in hashers]
+
+
+def range_rows(db: Session, model, ranges: Sequence[Sequence[int]]) -> List[dict]:
+    """
+    Devuelve las filas completas de los rangos indicados para compararlas una a una.
+
+    Args:
+        db (Session): Sesión de base de datos.
+        model: Modelo ORM con columnas id, username, password e is_active.
+        ranges (list): Rangos [inicio, fin) a leer.
+
+    Returns:
+        list[dict]: Filas con id, username, password e is_active.
+    """
+    rows = []
+    for start, end in ranges:
+        query = (
+            db.query(model.id, model.username, model.password, model.is_active)
+            .filter(model.id >= start, model.id < end)
+            .order_by(model.id)
+        )
+        rows.extend(
+            {"id": row_id, "username": username, "password": password, "is_active": bool(is_active)}
+            for row_id, username, password, is_active in query
+        )
+    return rows
@@ -4,23 +4,59 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 # Bcrypt para validar contraseñas encriptadas
 import bcrypt
+# Span para medir el coste de bcrypt dentro de la traza de la petición
+from tracing.tracing import start_span
 # Modelo de usuario para consultas a la base de datos
 import models.models as LoginModel
 # Esquema de datos de la autenticación para validación
-from schemas.schemas import LoginSchema
+from schemas.schemas import LoginSchema, RangesSchema, RepairSchema
+# Funciones de resumen por rangos para la conciliación con User Service
+from reconciliation.digests import range_digests, range_rows
+# Funciones de agregación de SQLAlchemy
+from sqlalchemy import func
+# Errores de integridad y de datos al aplicar reparaciones
+from sqlalchemy.exc import DataError, IntegrityError
 # Dependencia de base de datos
-from dependencies.dependencies import db_dependency
+from dependencies.dependencies import (
+    db_dependency,
+    read_db_dependency,
+    mark_username_write,
+    username_written_recently,
+)
+# Fábrica de sesiones del primario para releer si la réplica aún no tiene el usuario o su contraseña
+from database.database import SessionLocal, ReplicaSessions
 # Función que genera el token JWT
-from services.services import create_access_token, get_current_user
+from services.services import create_access_token, get_current_user, require_service_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prefijo del username provisional de las filas cuyo username pasa a otro ID
+RELEASED_USERNAME_PREFIX = "~reconcile~"
 
 # Crea el router de autenticación
 auth_router = APIRouter()
+# Router de conciliación: solo accesible para User Service con el token compartido
+reconcile_router = APIRouter(dependencies=[Depends(require_service_token)])
+
+# Busca el usuario directamente en el primario
+def _find_login_in_primary(username: str):
+    primary = SessionLocal()
+    try:
+        return primary.query(LoginModel.Login).filter(LoginModel.Login.username == username).first()
+    finally:
+        primary.close()
+
+# Compara la contraseña con su hash bcrypt dentro de un span de la traza
+def _check_password(password: str, password_hash: str) -> bool:
+    with start_span("bcrypt.checkpw"):
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
 
 # Ruta para iniciar sesión y generar un token JWT
 @auth_router.post("/login", tags=["Auth"])
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),  # Extrae username y password del cuerpo del request (tipo form)
-    db: db_dependency = None  # Inyecta la sesión de base de datos
+    db: read_db_dependency = None  # Inyecta una sesión de lectura (réplica)
 ):
     """
     Autenticación de usuarios usando username y password.\n
@@ -34,15 +70,29 @@ def login(
         dict: Un diccionario con el token JWT y el tipo de token (bearer).\n
     """
 
-    # Busca el usuario por nombre de usuario
-    user = db.query(LoginModel.Login).filter(LoginModel.Login.username == form_data.username).first()
+    # Los usernames creados o modificados hace poco desde User Service se leen del primario
+    if ReplicaSessions and username_written_recently(form_data.username):
+        user, checked_primary = _find_login_in_primary(form_data.username), True
+    else:
+        user = db.query(LoginModel.Login).filter(LoginModel.Login.username == form_data.username).first()
+        checked_primary = not ReplicaSessions
+
+    # Verifica si la contraseña es correcta
+    valid_password = user is not None and _check_password(form_data.password, user.password)
+
+    # Si la réplica no tiene el usuario o la contraseña no coincide, puede ir retrasada:
+    # se consulta el primario y bcrypt solo se repite si el hash es distinto
+    if not valid_password and not checked_primary:
+        primary_user = _find_login_in_primary(form_data.username)
+        if primary_user and (user is None or primary_user.password != user.password):
+            valid_password = _check_password(form_data.password, primary_user.password)
+        user = primary_user
 
     # Si no se encuentra el usuario, retorna error 404
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    # Verifica si la contraseña es correcta
-    if not bcrypt.checkpw(form_data.password.encode("utf-8"), user.password.encode("utf-8")):
+    if not valid_password:
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
 
     # Genera el token JWT con el ID del usuario como "sub"
@@ -94,6 +144,8 @@ async def create_user(
     db_user = LoginModel.Login(**user.dict())
     db.add(db_user)
     db.commit()
+    # El login de este username leerá del primario mientras las réplicas se ponen al día
+    mark_username_write(user.username)
 
     return {"message": "Usuario creado exitosamente"}
 
@@ -122,9 +174,122 @@ async def update_user(
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
     # Actualiza los campos del usuario
+    previous_username = db_user.username
     for field, value in user.dict(exclude_unset=True).items():
         setattr(db_user, field, value)
 
     db.commit()
     db.refresh(db_user)
-    return {"message": "Usuario actualizado exitosamente"}
\ No newline at end of file
+    # El username anterior y el nuevo leen del primario: la réplica aún tiene los datos viejos
+    mark_username_write(previous_username)
+    mark_username_write(db_user.username)
+    return {"message": "Usuario actualizado exitosamente"}
+
+# Ruta: Límites de IDs de la tabla login para iniciar la conciliación
+@reconcile_router.get("/reconcile/bounds", tags=["Reconcile"])
+def reconcile_bounds(db: db_dependency):
+    """
+    Devuelve el menor y el mayor ID de la tabla login.\n
+    Returns:\n
+        dict: min_id y max_id (None si la tabla está vacía).
+    """
+    min_id, max_id = db.query(func.min(LoginModel.Login.id), func.max(LoginModel.Login.id)).one()
+    return {"min_id": min_id, "max_id": max_id}
+
+# Ruta: Resúmenes por rango de IDs de la tabla login
+@reconcile_router.post("/reconcile/digests", tags=["Reconcile"])
+def reconcile_digests(body: RangesSchema, db: db_dependency):
+    """
+    Calcula un resumen de (username, password, is_active) por cada rango de IDs.\n
+    Args:\n
+        body (RangesSchema): Rangos [inicio, fin) ordenados y sin solaparse.\n
+        db (Session): Sesión de base de datos (primario, para comparar datos recientes).\n
+    Returns:\n
+        dict: Lista de resúmenes en el mismo orden que los rangos.
+    """
+    return {"digests": range_digests(db, LoginModel.Login, body.ranges)}
+
+# Ruta: Filas de login de los rangos que no coinciden
+@reconcile_router.post("/reconcile/rows", tags=["Reconcile"])
+def reconcile_rows(body: RangesSchema, db: db_dependency):
+    """
+    Devuelve las filas de login de los rangos indicados.\n
+    Args:\n
+        body (RangesSchema): Rangos [inicio, fin) a leer.\n
+        db (Session): Sesión de base de datos.\n
+    Returns:\n
+        dict: Filas con id, username, password e is_active.
+    """
+    return {"rows": range_rows(db, LoginModel.Login, body.ranges)}
+
+# Ruta: Aplica un lote de reparaciones calculado por User Service
+@reconcile_router.post("/reconcile/repair", tags=["Reconcile"])
+def reconcile_repair(body: RepairSchema, db: db_dependency):
+    """
+    Inserta o actualiza las filas indicadas y elimina los IDs sobrantes.\n
+    Args:\n
+        body (RepairSchema): Filas a insertar o actualizar e IDs a eliminar.\n
+        db (Session): Sesión de base de datos.\n
+    Returns:\n
+        dict: Número de filas insertadas, actualizadas y eliminadas, e IDs que no se pudieron reparar.
+    """
+    deleted = 0
+    if body.deletes:
+        # Se eliminan primero para liberar usernames que se reasignan en el mismo lote
+        deleted = (
+            db.query(LoginModel.Login)
+            .filter(LoginModel.Login.id.in_(body.deletes))
+            .delete(synchronize_session=False)
+        )
+        db.flush()
+
+    ids = [row.id for row in body.upserts]
+    existing = {
+        login.id: login
+        for login in db.query(LoginModel.Login).filter(LoginModel.Login.id.in_(ids))
+    } if ids else {}
+
+    # Las filas que hoy tienen un username que el lote asigna a otro ID (intercambios,
+    # cadenas) reciben uno provisional; si no están en este lote, se corrigen en el suyo
+    targets = {row.username: row.id for row in body.upserts}
+    holders = db.query(LoginModel.Login).filter(LoginModel.Login.username.in_(targets)).all() if targets else []
+    for holder in holders:
+        if targets[holder.username] != holder.id:
+            holder.username = f"{RELEASED_USERNAME_PREFIX}{holder.id}"
+    db.flush()
+
+    failed = []
+    try:
+        with db.begin_nested():
+            inserted, updated = _apply_upserts(db, body.upserts, existing)
+    except (IntegrityError, DataError):
+        # Algún conflicto no se pudo resolver: se aplica fila a fila para aislar las que fallan
+        inserted = updated = 0
+        for row in body.upserts:
+            try:
+                with db.begin_nested():
+                    row_inserted, row_updated = _apply_upserts(db, [row], existing)
+            except (IntegrityError, DataError):
+                failed.append(row.id)
+                continue
+            inserted += row_inserted
+            updated += row_updated
+        logger.warning("Conciliación: %d filas no se pudieron reparar: %s", len(failed), failed)
+
+    db.commit()
+    return {"inserted": inserted, "updated": updated, "deleted": deleted, "failed": failed}
+
+# Inserta o actualiza las filas de login y devuelve cuántas se insertaron y actualizaron
+def _apply_upserts(db, rows, existing: dict):
+    inserted = updated = 0
+    for row in rows:
+        login = existing.get(row.id)
+        if login:
+            for field, value in row.dict().items():
+                setattr(login, field, value)
+            updated += 1
+        else:
+            db.add(LoginModel.Login(**row.dict()))
+            inserted += 1
+    db.flush()
+    return inserted, updated
@@ -1,5 +1,7 @@
 # Clase base de Pydantic para crear modelos de validación de datos
 from pydantic import BaseModel
+# Tipos genéricos para listas en los esquemas de conciliación
+from typing import List
 
 # Define un esquema para el modelo Login
 # Este esquema se usa para validar datos entrantes (por ejemplo, en requests)
@@ -8,4 +10,19 @@ class LoginSchema(BaseModel):
     username: str
     # Campo password: cadena de texto
     password: str
-    
\ No newline at end of file
+
+# Esquema con una lista de rangos de IDs [inicio, fin) para la conciliación
+class RangesSchema(BaseModel):
+    ranges: List[List[int]]
+
+# Esquema de una fila de login tal como se compara entre servicios
+class LoginRowSchema(BaseModel):
+    id: int
+    username: str
+    password: str
+    is_active: bool = True
+
+# Esquema de reparación: filas a insertar o actualizar e IDs a eliminar
+class RepairSchema(BaseModel):
+    upserts: List[LoginRowSchema] = []
+    deletes: List[int] = []
@@ -2,13 +2,16 @@
 from datetime import datetime, timedelta
 # Herramientas de FastAPI para manejo de errores y dependencias
 import bcrypt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 # Esquema OAuth2 para autenticación vía token bearer
 from fastapi.security import OAuth2PasswordBearer
 # Librerías para trabajar con JWT (codificar, decodificar, validar)
 from jose import JWTError, jwt
 # Configuración de variables de entorno
 from dotenv import load_dotenv
+# Comparación en tiempo constante del token entre servicios
+import hmac
+from typing import Optional
 import os
 
 # Carga las variables del archivo .env
@@ -18,6 +21,8 @@ load_dotenv()
 SECRET_KEY = str(os.getenv("SECRET_KEY"))  # Clave secreta para firmar tokens
 ALGORITHM = str(os.getenv("ALGORITHM"))    # Algoritmo de firma (ej: HS256)
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))  # Minutos de expiración
+# Token compartido con User Service para las rutas internas (conciliación)
+SERVICE_TOKEN = os.getenv("SERVICE_TOKEN")
 
 # Define el esquema OAuth2: se usará en rutas protegidas con "Depends"
 # El cliente enviará el token JWT usando el header Authorization: Bearer <token>
@@ -80,3 +85,21 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         # Si falla la decodificación o está alterado, lanza excepción
         raise credentials_exception
+
+
+# Función que protege las rutas internas entre servicios (conciliación)
+def require_service_token(x_service_token: Optional[str] = Header(None)):
+    """
+    Comprueba la cabecera X-Service-Token contra el token compartido SERVICE_TOKEN.
+    Si SERVICE_TOKEN no está configurado, las rutas internas quedan deshabilitadas.
+
+    Args:
+        x_service_token (str, opcional): Token enviado por el otro servicio.
+
+    Raises:
+        HTTPException: 403 si no hay token configurado, 401 si el token no coincide.
+    """
+    if not SERVICE_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Rutas internas deshabilitadas")
+    if not x_service_token or not hmac.compare_digest(x_service_token.encode("utf-8"), SERVICE_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de servicio inválido")
@@ -0,0 +1,77 @@
+# Compara bytes enviados y CPU por respuesta para cada codificación y nivel de compresión
+#
+# Uso (desde backend/user-service):
+#   python benchmarks/compression.py [--rows 2000] [--requests 20] [--levels 1,5,9]
+#
+# La respuesta simula el listado de usuarios (JSON con hashes bcrypt, poco comprimibles).
+# La CPU se toma de las métricas del middleware (time.thread_time), así que no incluye
+# la serialización ni el tiempo del cliente. zstd y br solo aparecen si están instalados.
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from middleware.compression import CompressionMiddleware, CompressionRule, supported_encodings
+
+
+def sample_users(rows: int) -> list:
+    return [
+        {
+            "id": index,
+            "email": f"user{index}@example.com",
+            "username": f"user{index}",
+            "password": "$2b$12$" + os.urandom(40).hex()[:53],
+            "is_active": True,
+        }
+        for index in range(rows)
+    ]
+
+
+def measure(users: list, encoding: str, level: int, requests: int) -> dict:
+    app = FastAPI()
+
+    @app.get("/users")
+    def list_users():
+        return users
+
+    app.add_middleware(CompressionMiddleware, rules=[CompressionRule(r"/users", level=level)])
+    with TestClient(app) as client:
+        for _ in range(requests):
+            response = client.get("/users", headers={"Accept-Encoding": encoding})
+        middleware = app.middleware_stack
+        while not isinstance(middleware, CompressionMiddleware):
+            middleware = middleware.app
+
+    assert response.json() == users
+    return {
+        "encoding": response.headers.get("content-encoding", "identity"),
+        "raw": len(response.content),
+        "wire": response.num_bytes_downloaded,
+        "cpu_ms": middleware.stats["cpu_seconds"] / requests * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes y CPU por codificación y nivel")
+    parser.add_argument("--rows", type=int, default=2000, help="Usuarios en la respuesta")
+    parser.add_argument("--requests", type=int, default=20, help="Peticiones por combinación")
+    parser.add_argument("--levels", default="1,5,9", help="Niveles de compresión a comparar")
+    args = parser.parse_args()
+
+    users = sample_users(args.rows)
+    levels = [int(level) for level in args.levels.split(",")]
+    print(f"{'codificación':<13}{'nivel':>6}{'bytes':>10}{'ratio':>8}{'CPU ms/resp':>13}")
+    baseline = measure(users, "identity", levels[0], 1)
+    print(f"{'identity':<13}{'-':>6}{baseline['wire']:>10}{1:>8.2f}{0:>13.3f}")
+    for encoding in supported_encodings():
+        for level in levels:
+            result = measure(users, encoding, level, args.requests)
+            ratio = result["raw"] / result["wire"]
+            print(f"{result['encoding']:<13}{level:>6}{result['wire']:>10}{ratio:>8.2f}{result['cpu_ms']:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
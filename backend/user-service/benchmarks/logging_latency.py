@@ -0,0 +1,105 @@
+# Mide la latencia por petición con los logs apagados (LOG_ENABLED=false) y encendidos (true)
+#
+# Uso (desde backend/user-service):
+#   python benchmarks/logging_latency.py [--requests 5000]
+#
+# Cada modo corre en un proceso propio porque LOG_ENABLED se lee al importar logs.logs.
+# La app se ejecuta en proceso con httpx.ASGITransport, sin red ni base de datos, para
+# que la diferencia entre modos sea solo el coste de registrar los logs.
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Usuario de ejemplo similar a los que registran los routers
+SAMPLE_USER = {"id": 1, "email": "ana@example.com", "username": "ana", "is_active": True, "bio": "x" * 200}
+
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def measure(requests: int, warmup: int) -> dict:
+    sys.path.insert(0, SERVICE_DIR)
+    import httpx
+    from fastapi import FastAPI
+    from logs.logs import RequestIdMiddleware, setup_logging, shutdown_logging
+
+    setup_logging("logging-benchmark")
+    logger = logging.getLogger("benchmark")
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.post("/users")
+    async def create_user():
+        # Un registro informativo y una advertencia por petición, como en el alta de usuarios
+        logger.info("Usuario creado: id=%s username=%s", SAMPLE_USER["id"], SAMPLE_USER["username"])
+        logger.warning("Auth service respondió con error: %s - %s", 500, SAMPLE_USER)
+        return {"id": SAMPLE_USER["id"]}
+
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(warmup):
+            await client.post("/users")
+        for _ in range(requests):
+            started = time.perf_counter()
+            await client.post("/users")
+            latencies.append((time.perf_counter() - started) * 1e6)
+    shutdown_logging()
+
+    latencies.sort()
+    return {
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "mean": sum(latencies) / len(latencies),
+    }
+
+
+def run_mode(enabled: bool, requests: int, warmup: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "LOG_ENABLED": "true" if enabled else "false",
+            "LOG_LEVEL": "INFO",
+            # Escribe a archivo para no medir la terminal
+            "LOG_FILE": os.path.join(tmp, "bench.log"),
+        }
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", "--requests", str(requests), "--warmup", str(warmup)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    p50, p99, mean = (float(value) for value in output.split())
+    return {"p50": p50, "p99": p99, "mean": mean}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia con logs apagados y encendidos")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(measure(args.requests, args.warmup))
+        print(result["p50"], result["p99"], result["mean"])
+        return
+
+    results = {label: run_mode(enabled, args.requests, args.warmup) for label, enabled in (("off", False), ("on", True))}
+    print(f"{'LOG_ENABLED':<12}{'p50 (us)':>10}{'p99 (us)':>10}{'media (us)':>12}")
+    for label, result in results.items():
+        print(f"{label:<12}{result['p50']:>10.0f}{result['p99']:>10.0f}{result['mean']:>12.0f}")
+    overhead = results["on"]["p50"] - results["off"]["p50"]
+    print(f"Coste de los logs en p50: {overhead:.0f} us por petición")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# Herramientas de asyncio para la cola de espera con prioridad
+import asyncio
+import heapq
+import itertools
+import json
+# Expresiones regulares para asociar rutas con sus límites
+import re
+from typing import List, Optional
+# Carga variables de entorno desde el archivo .env
+from dotenv import load_dotenv
+import logging
+import os
+
+# Carga las variables del archivo .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto del limitador global desde variables de entorno
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "32"))  # Peticiones simultáneas en toda la app
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "16"))          # Peticiones que pueden esperar turno
+QUEUE_TIMEOUT_MS = int(os.getenv("QUEUE_TIMEOUT_MS", "100"))               # Espera máxima en la cola (milisegundos)
+RESERVED_PRIORITY_SLOTS = int(os.getenv("RESERVED_PRIORITY_SLOTS", "4"))   # Cupos reservados para prioridad alta
+
+# Prioridades: un número menor se atiende primero
+PRIORITY_CRITICAL = 0  # Nunca se limita (health checks)
+PRIORITY_HIGH = 1      # Puede usar todos los cupos, incluidos los reservados (login)
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3       # Listados y exportaciones: primeros en descartarse
+
+
+class PriorityLimiter:
+    """
+    Semáforo con cola acotada y prioridades.
+
+    Las peticiones que no encuentran cupo esperan como máximo `queue_timeout`
+    segundos en una cola de tamaño `max_queue`; si la cola está llena se
+    rechazan de inmediato. Las prioridades normales y bajas no pueden usar los
+    `reserved` cupos que se guardan para las de prioridad alta.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float, reserved: int = 0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.reserved = min(reserved, max(limit - 1, 0))
+        self.in_use = 0
+        self.queued = 0
+        self.rejected = 0
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def _capacity(self, priority: int) -> int:
+        # Cupos disponibles según la prioridad de la petición
+        if priority <= PRIORITY_HIGH:
+            return self.limit
+        return self.limit - self.reserved
+
+    def _waiter_ahead(self, priority: int) -> bool:
+        # Indica si hay alguien en la cola con la misma o mayor prioridad
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters) and self._waiters[0][0] <= priority
+
+    async def acquire(self, priority: int) -> bool:
+        """
+        Intenta obtener un cupo, esperando en la cola si es necesario.
+
+        Args:
+            priority (int): Prioridad de la petición.
+
+        Returns:
+            bool: True si se obtuvo el cupo, False si la petición debe descartarse.
+        """
+        if not self._waiter_ahead(priority) and self.in_use < self._capacity(priority):
+            self.in_use += 1
+            return True
+
+        if self.queued >= self.max_queue or self.queue_timeout <= 0:
+            self.rejected += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        self.queued += 1
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # El cliente se desconectó mientras esperaba
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self.queued -= 1
+                future.cancel()
+            raise
+
+        if future.done():
+            # release() ya transfirió el cupo a esta petición
+            return True
+
+        self.queued -= 1
+        future.cancel()
+        self.rejected += 1
+        return False
+
+    def release(self):
+        """
+        Libera un cupo y se lo entrega a la petición en cola con mayor prioridad.
+        """
+        self.in_use -= 1
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_use >= self._capacity(priority):
+                break
+            heapq.heappop(self._waiters)
+            self.queued -= 1
+            self.in_use += 1
+            future.set_result(True)
+
+    def snapshot(self) -> dict:
+        """
+        Devuelve el estado actual del limitador.
+        """
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class RouteLimit:
+    """
+    Regla que asocia un método y una ruta con una prioridad y, opcionalmente,
+    con un límite de concurrencia propio.
+
+    Args:
+        method (str): Método HTTP o "*" para cualquiera.
+        path (str): Expresión regular que debe coincidir con la ruta completa.
+        priority (int): Prioridad de las peticiones que coinciden.
+        limit (int, opcional): Máximo de peticiones simultáneas para esta ruta.
+    """
+
+    def __init__(self, method: str, path: str, priority: int = PRIORITY_NORMAL, limit: Optional[int] = None):
+        self.method = method.upper()
+        self.pattern = re.compile(path)
+        self.priority = priority
+        self.limit = limit
+
+    def matches(self, method: str, path: str) -> bool:
+        return self.method in ("*", method) and self.pattern.fullmatch(path) is not None
+
+
+class LoadSheddingMiddleware:
+    """
+    Middleware ASGI que limita la concurrencia por ruta y global, con una cola
+    corta de espera, y responde 503 de inmediato a las peticiones sobrantes.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: Optional[List[RouteLimit]] = None,
+        limit: int = MAX_CONCURRENT_REQUESTS,
+        max_queue: int = MAX_QUEUED_REQUESTS,
+        queue_timeout: float = QUEUE_TIMEOUT_MS / 1000,
+        reserved: int = RESERVED_PRIORITY_SLOTS,
+    ):
+        self.app = app
+        self.routes = routes or []
+        self.global_limiter = PriorityLimiter("global", limit, max_queue, queue_timeout, reserved)
+        # Un limitador propio por cada regla que define un límite
+        self.route_limiters = {
+            id(route): PriorityLimiter(route.pattern.pattern, route.limit, max_queue, queue_timeout)
+            for route in self.routes
+            if route.limit
+        }
+        limiters.append(self)
+
+    def _match(self, method: str, path: str) -> Optional[RouteLimit]:
+        # Devuelve la primera regla que coincide con la petición
+        for route in self.routes:
+            if route.matches(method, path):
+                return route
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._match(scope["method"], scope["path"])
+        priority = route.priority if route else PRIORITY_NORMAL
+        if priority == PRIORITY_CRITICAL:
+            await self.app(scope, receive, send)
+            return
+
+        route_limiter = self.route_limiters.get(id(route)) if route else None
+        if route_limiter and not await route_limiter.acquire(priority):
+            await self._reject(scope, send)
+            return
+
+        try:
+            if not await self.global_limiter.acquire(priority):
+                await self._reject(scope, send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.global_limiter.release()
+        finally:
+            if route_limiter:
+                route_limiter.release()
+
+    async def _reject(self, scope, send):
+        # Responde 503 sin ejecutar la ruta para no saturar hilos ni conexiones
+        logger.warning("Petición descartada por saturación: %s %s", scope["method"], scope["path"])
+        body = json.dumps({"detail": "Servicio saturado, intente más tarde"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def snapshot(self) -> dict:
+        """
+        Devuelve el estado de todos los limitadores del middleware.
+        """
+        return {
+            "global": self.global_limiter.snapshot(),
+            "routes": [limiter.snapshot() for limiter in self.route_limiters.values()],
+        }
+
+
+# Registro de middlewares creados para poder exponer su estado
+limiters: List[LoadSheddingMiddleware] = []
+
+
+def get_limiter_states() -> List[dict]:
+    """
+    Devuelve el estado de los limitadores de concurrencia registrados.
+    """
+    return [middleware.snapshot() for middleware in limiters]
@@ -0,0 +1,223 @@
+# Herramientas para ejecutar la conciliación desde la línea de comandos
+import argparse
+import asyncio
+import json
+from typing import Dict, List, Sequence, Tuple
+# Ejecuta las consultas bloqueantes fuera del event loop
+from starlette.concurrency import run_in_threadpool
+# Funciones de agregación de SQLAlchemy
+from sqlalchemy import func
+# Clase Session de SQLAlchemy para tipar correctamente
+from sqlalchemy.orm import Session
+# Fábrica de sesiones para ejecutar el comando fuera de FastAPI
+from database.database import SessionLocal
+# Modelo de usuario definido con SQLAlchemy
+import models.models as UserModel
+# Funciones de resumen por rangos compartidas con Auth Service
+from reconciliation.digests import range_digests, range_rows, split_range
+# Cliente resiliente hacia Auth Service
+from resilience.resilience import ResilientClient
+# Carga variables de entorno desde el archivo .env
+from dotenv import load_dotenv
+import logging
+import os
+
+# Carga las variables del archivo .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto de la conciliación desde variables de entorno
+RECONCILE_FANOUT = int(os.getenv("RECONCILE_FANOUT", "16"))            # Subrangos por cada rango que no coincide
+RECONCILE_LEAF_SIZE = int(os.getenv("RECONCILE_LEAF_SIZE", "256"))     # IDs por rango a partir del cual se comparan filas
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "500"))   # Filas por lote de reparación
+RECONCILE_MAX_RANGES = int(os.getenv("RECONCILE_MAX_RANGES", "512"))   # Rangos por petición de resúmenes
+RECONCILE_TIMEOUT = float(os.getenv("RECONCILE_TIMEOUT", "30"))        # Timeout por petición (los resúmenes recorren muchas filas)
+
+# Cliente hacia Auth Service con un timeout acorde a los recorridos por rangos;
+# las rutas de conciliación exigen el token compartido entre servicios
+reconcile_client = ResilientClient(
+    "auth-service-reconcile",
+    os.getenv("AUTH_SERVICE_URL"),
+    timeout=RECONCILE_TIMEOUT,
+    headers={"X-Service-Token": os.getenv("SERVICE_TOKEN") or ""},
+)
+
+
+def _local_bounds(db: Session) -> Tuple[int, int]:
+    # Menor y mayor ID de la tabla users
+    return db.query(func.min(UserModel.User.id), func.max(UserModel.User.id)).one()
+
+
+def _chunks(items: Sequence, size: int):
+    # Divide una lista en trozos de tamaño fijo
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+class _Transfer:
+    # Cuenta las peticiones y los bytes intercambiados con Auth Service
+    def __init__(self, client: ResilientClient):
+        self.client = client
+        self.requests = 0
+        self.bytes = 0
+
+    async def call(self, method: str, path: str, payload=None) -> dict:
+        kwargs = {"json": payload} if payload is not None else {}
+        response = await self.client.request(method, path, **kwargs)
+        response.raise_for_status()
+        self.requests += 1
+        # Bytes recibidos tal como viajaron (comprimidos) más el cuerpo JSON enviado
+        self.bytes += response.num_bytes_downloaded + len(json.dumps(payload or {}))
+        return response.json()
+
+
+async def reconcile_logins(
+    db: Session,
+    client: ResilientClient = reconcile_client,
+    fanout: int = RECONCILE_FANOUT,
+    leaf_size: int = RECONCILE_LEAF_SIZE,
+    batch_size: int = RECONCILE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Concilia la tabla users (origen de verdad) con la tabla login de Auth Service.
+
+    Compara resúmenes por rangos de IDs, baja solo por los rangos que no
+    coinciden hasta llegar a rangos de `leaf_size` IDs, compara esas filas una a
+    una y envía las reparaciones en lotes de `batch_size` filas.
+
+    Args:
+        db (Session): Sesión de base de datos de User Service.
+        client (ResilientClient): Cliente hacia Auth Service.
+        fanout (int): Subrangos por cada rango que no coincide.
+        leaf_size (int): Tamaño de rango a partir del cual se comparan filas.
+        batch_size (int): Filas por lote de reparación.
+        dry_run (bool): Si es True, solo calcula las diferencias sin repararlas.
+
+    Returns:
+        dict: Resumen con rangos comparados, diferencias encontradas, IDs que no se
+        pudieron reparar y bytes transferidos.
+
+    Raises:
+        ValueError: Si fanout es menor que 2 o leaf_size o batch_size son menores que 1.
+    """
+    # Con fanout < 2 los rangos no se reducen al dividirlos y el recorrido no termina
+    if fanout < 2:
+        raise ValueError(f"fanout debe ser al menos 2 (recibido {fanout})")
+    if leaf_size < 1 or batch_size < 1:
+        raise ValueError(f"leaf_size y batch_size deben ser al menos 1 (recibidos {leaf_size}, {batch_size})")
+
+    transfer = _Transfer(client)
+    report = {
+        "ranges_compared": 0,
+        "mismatched_leaves": 0,
+        "rows_compared": 0,
+        "upserts": 0,
+        "deletes": 0,
+        "failed_ids": [],
+    }
+
+    remote = await transfer.call("GET", "/reconcile/bounds")
+    local_min, local_max = await run_in_threadpool(_local_bounds, db)
+    lows = [value for value in (local_min, remote["min_id"]) if value is not None]
+    highs = [value for value in (local_max, remote["max_id"]) if value is not None]
+    if not lows:
+        report.update(requests=transfer.requests, bytes_transferred=transfer.bytes)
+        return report
+
+    # 1️⃣ Bajar por el árbol de rangos solo donde los resúmenes difieren
+    pending: List[Tuple[int, int]] = [(min(lows), max(highs) + 1)]
+    leaves: List[Tuple[int, int]] = []
+    while pending:
+        candidates = [part for start, end in pending for part in split_range(start, end, fanout)]
+        pending = []
+        for chunk in _chunks(candidates, RECONCILE_MAX_RANGES):
+            local_digests = await run_in_threadpool(range_digests, db, UserModel.User, chunk)
+            remote_digests = (await transfer.call("POST", "/reconcile/digests", {"ranges": chunk}))["digests"]
+            report["ranges_compared"] += len(chunk)
+            for (start, end), local_digest, remote_digest in zip(chunk, local_digests, remote_digests):
+                if local_digest == remote_digest:
+                    continue
+                # Los rangos pequeños o que ya no se pueden dividir se comparan fila a fila
+                if end - start <= leaf_size or len(split_range(start, end, fanout)) < 2:
+                    leaves.append((start, end))
+                else:
+                    pending.append((start, end))
+
+    report["mismatched_leaves"] = len(leaves)
+
+    # 2️⃣ Comparar fila a fila los rangos hoja y reparar por lotes
+    upserts: List[dict] = []
+    deletes: List[int] = []
+    leaves_per_request = max(batch_size // max(leaf_size, 1), 1)
+    for chunk in _chunks(leaves, leaves_per_request):
+        local_rows = {row["id"]: row for row in await run_in_threadpool(range_rows, db, UserModel.User, chunk)}
+        remote_rows = {
+            row["id"]: row
+            for row in (await transfer.call("POST", "/reconcile/rows", {"ranges": chunk}))["rows"]
+        }
+        report["rows_compared"] += len(local_rows.keys() | remote_rows.keys())
+        upserts.extend(row for row_id, row in local_rows.items() if remote_rows.get(row_id) != row)
+        deletes.extend(row_id for row_id in remote_rows if row_id not in local_rows)
+
+    report["upserts"] = len(upserts)
+    report["deletes"] = len(deletes)
+
+    if not dry_run:
+        # Primero todas las eliminaciones para liberar usernames reasignados
+        for chunk in _chunks(deletes, batch_size):
+            await transfer.call("POST", "/reconcile/repair", {"upserts": [], "deletes": chunk})
+        for chunk in _chunks(upserts, batch_size):
+            result = await transfer.call("POST", "/reconcile/repair", {"upserts": chunk, "deletes": []})
+            # Las filas que Auth Service no pudo reparar se informan sin abortar la conciliación
+            report["failed_ids"].extend(result.get("failed", []))
+
+    report["requests"] = transfer.requests
+    report["bytes_transferred"] = transfer.bytes
+    logger.info("Conciliación users/login terminada: %s", report)
+    return report
+
+
+def _int_at_least(minimum: int):
+    # Tipo para argparse que rechaza enteros menores que `minimum`
+    def parse(value: str) -> int:
+        number = int(value)
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"debe ser al menos {minimum}")
+        return number
+    return parse
+
+
+def main():
+    """
+    Ejecuta la conciliación desde la línea de comandos:
+
+        python -m reconciliation.reconciler [--dry-run]
+    """
+    parser = argparse.ArgumentParser(description="Concilia la tabla users con la tabla login de Auth Service")
+    parser.add_argument("--dry-run", action="store_true", help="Solo muestra las diferencias sin repararlas")
+    parser.add_argument("--fanout", type=_int_at_least(2), default=RECONCILE_FANOUT)
+    parser.add_argument("--leaf-size", type=_int_at_least(1), default=RECONCILE_LEAF_SIZE)
+    parser.add_argument("--batch-size", type=_int_at_least(1), default=RECONCILE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    async def run():
+        db = SessionLocal()
+        try:
+            return await reconcile_logins(
+                db,
+                fanout=args.fanout,
+                leaf_size=args.leaf_size,
+                batch_size=args.batch_size,
+                dry_run=args.dry_run,
+            )
+        finally:
+            db.close()
+            await reconcile_client.aclose()
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
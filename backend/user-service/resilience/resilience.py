@@ -0,0 +1,399 @@
+# Herramientas de asyncio para medir el tiempo y esperar entre reintentos
+import asyncio
+# Lock para proteger el estado compartido del circuit breaker
+import threading
+import time
+# deque para la ventana deslizante de resultados
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+# Cliente HTTP asíncrono usado para llamar a otros servicios
+import httpx
+# Carga variables de entorno desde el archivo .env
+from dotenv import load_dotenv
+# Trazado distribuido: span por llamada saliente y propagación de traceparent
+from tracing.tracing import start_span, inject_headers
+import logging
+import os
+
+# Carga las variables del archivo .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto del circuit breaker desde variables de entorno
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))      # Porcentaje de errores para abrir el circuito
+BREAKER_MINIMUM_CALLS = int(os.getenv("BREAKER_MINIMUM_CALLS", "10"))       # Llamadas mínimas antes de evaluar el porcentaje
+BREAKER_WINDOW_SIZE = int(os.getenv("BREAKER_WINDOW_SIZE", "20"))           # Tamaño de la ventana deslizante
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))     # Segundos en estado abierto antes de probar
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))    # Llamadas de prueba en estado semiabierto
+
+# Configuración por defecto del presupuesto de reintentos
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))          # Reintentos permitidos por cada petición
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1"))  # Reintentos mínimos por segundo
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "2"))              # Reintentos máximos por petición
+
+# Estados posibles del circuit breaker
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Métodos HTTP que se pueden reintentar sin riesgo de duplicar efectos
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(Exception):
+    """
+    Se lanza cuando el circuito está abierto y la llamada se rechaza sin contactar al servicio.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuito abierto para {name}")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con ventana deslizante por número de llamadas.
+
+    Abre el circuito cuando el porcentaje de errores supera el umbral, rechaza
+    llamadas mientras está abierto y, tras `reset_timeout`, deja pasar un número
+    limitado de llamadas de prueba (semiabierto) para decidir si se cierra.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        minimum_calls: int = BREAKER_MINIMUM_CALLS,
+        window_size: int = BREAKER_WINDOW_SIZE,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+        half_open_calls: int = BREAKER_HALF_OPEN_CALLS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self.state = STATE_CLOSED
+        self.opened_at = 0.0
+        self.total_rejected = 0
+        self._window = deque(maxlen=window_size)
+        self._half_open_in_flight = 0
+        self._half_open_since = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Indica si una llamada puede salir hacia el servicio.
+
+        Returns:
+            bool: True si se permite la llamada, False si el circuito la rechaza.
+        """
+        with self._lock:
+            if self.state == STATE_OPEN:
+                if self._clock() - self.opened_at < self.reset_timeout:
+                    self.total_rejected += 1
+                    return False
+                # Pasado el tiempo de espera, se pasa a semiabierto para probar
+                self._transition(STATE_HALF_OPEN)
+
+            if self.state == STATE_HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_calls:
+                    if self._clock() - self._half_open_since < self.reset_timeout:
+                        self.total_rejected += 1
+                        return False
+                    # Las pruebas en curso llevan demasiado tiempo sin resultado: se rearman
+                    logger.warning("Circuit breaker %s: pruebas sin resultado, se rearman", self.name)
+                    self._half_open_in_flight = 0
+                    self._half_open_since = self._clock()
+                self._half_open_in_flight += 1
+
+            return True
+
+    def release_probe(self):
+        """
+        Libera una llamada de prueba que terminó sin resultado (por ejemplo, cancelada
+        por quien llama) sin contarla como éxito ni como fallo del servicio.
+        """
+        with self._lock:
+            if self.state == STATE_HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+
+    def record_success(self):
+        """
+        Registra una llamada exitosa.
+        """
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                # La prueba fue exitosa: se cierra el circuito con la ventana limpia
+                self._transition(STATE_CLOSED)
+                return
+            self._window.append(True)
+
+    def record_failure(self):
+        """
+        Registra una llamada fallida y abre el circuito si se supera el umbral.
+        """
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                # La prueba falló: se vuelve a abrir el circuito
+                self._transition(STATE_OPEN)
+                return
+            self._window.append(False)
+            if len(self._window) >= self.minimum_calls and self.error_rate() >= self.failure_rate:
+                self._transition(STATE_OPEN)
+
+    def error_rate(self) -> float:
+        """
+        Calcula el porcentaje de errores dentro de la ventana actual.
+        """
+        if not self._window:
+            return 0.0
+        return self._window.count(False) / len(self._window)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado actual del circuit breaker para exponerlo por la API.
+        """
+        with self._lock:
+            retry_in = None
+            if self.state == STATE_OPEN:
+                retry_in = round(max(self.reset_timeout - (self._clock() - self.opened_at), 0.0), 3)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "error_rate": round(self.error_rate(), 3),
+                "calls_in_window": len(self._window),
+                "rejected": self.total_rejected,
+                "retry_in": retry_in,
+            }
+
+    def _transition(self, new_state: str):
+        # Cambia de estado y reinicia los contadores asociados
+        if new_state != self.state:
+            logger.warning("Circuit breaker %s: %s -> %s", self.name, self.state, new_state)
+        self.state = new_state
+        self._half_open_in_flight = 0
+        if new_state == STATE_OPEN:
+            self.opened_at = self._clock()
+        elif new_state == STATE_HALF_OPEN:
+            self._half_open_since = self._clock()
+        elif new_state == STATE_CLOSED:
+            self.opened_at = 0.0
+            self._window.clear()
+
+
+class RetryBudget:
+    """
+    Presupuesto de reintentos: limita los reintentos a una fracción de las
+    peticiones recientes para que un servicio caído no reciba el doble de tráfico.
+    """
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+        ttl: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.ttl = ttl
+        self._clock = clock
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """
+        Registra una petición original (no reintento).
+        """
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """
+        Intenta consumir un reintento del presupuesto.
+
+        Returns:
+            bool: True si todavía hay presupuesto para reintentar.
+        """
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            allowed = self.min_per_second * self.ttl + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+    def _prune(self, now: float):
+        # Descarta los registros que quedaron fuera de la ventana de tiempo
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.ttl:
+                events.popleft()
+
+
+class ResilientClient:
+    """
+    Cliente HTTP hacia un servicio concreto con plazo máximo por llamada,
+    circuit breaker y reintentos limitados por presupuesto.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float,
+        deadline: Optional[float] = None,
+        max_retries: int = RETRY_MAX_ATTEMPTS,
+        backoff: float = 0.05,
+        breaker: Optional[CircuitBreaker] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.deadline = deadline or timeout * (max_retries + 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker(name)
+        self.retry_budget = retry_budget or RetryBudget()
+        self.transport = transport
+        self.headers = headers
+        self._client: Optional[httpx.AsyncClient] = None
+        # Registra el cliente para poder exponer el estado de su circuito
+        clients[name] = self
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Reutiliza un único AsyncClient para aprovechar el pool de conexiones
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url or "", timeout=self.timeout, transport=self.transport, headers=self.headers
+            )
+        return self._client
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Envía una petición respetando el circuito, el plazo y el presupuesto de reintentos.
+
+        Args:
+            method (str): Método HTTP.
+            path (str): Ruta relativa a la URL base del servicio.
+            **kwargs: Argumentos adicionales para httpx (json, headers, etc.).
+
+        Returns:
+            httpx.Response: Respuesta del servicio.
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto.
+            httpx.HTTPError: Si todos los intentos fallan por errores de red o tiempo.
+        """
+        method = method.upper()
+        attributes = {"http.method": method, "peer.service": self.name, "http.target": path}
+        with start_span(f"{method} {self.name}{path}", kind="client", attributes=attributes) as span:
+            response = await self._request(method, path, span, **kwargs)
+            span.set_attribute("http.status_code", response.status_code)
+            return response
+
+    async def _request(self, method: str, path: str, span, **kwargs) -> httpx.Response:
+        # Intentos con circuito, plazo y presupuesto; propaga la traza en cada intento
+        kwargs["headers"] = inject_headers(kwargs.get("headers"))
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        self.retry_budget.record_request()
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(self.name)
+
+            remaining = deadline_at - loop.time()
+            timeout = min(self.timeout, max(remaining, 0.001))
+            retryable = False
+            try:
+                response = await self._get_client().request(method, path, timeout=timeout, **kwargs)
+            except httpx.ConnectError:
+                # La petición no llegó al servicio: siempre es seguro reintentar
+                self.breaker.record_failure()
+                retryable = True
+                if not self._should_retry(attempt, deadline_at, loop):
+                    raise
+            except httpx.TransportError:
+                # Timeout u otro error de red: solo se reintenta si es idempotente
+                self.breaker.record_failure()
+                retryable = method in IDEMPOTENT_METHODS
+                if not retryable or not self._should_retry(attempt, deadline_at, loop):
+                    raise
+            except asyncio.CancelledError:
+                # La cancelación viene de quien llama (desconexión, wait_for, apagado), no
+                # del servicio: solo se libera la llamada de prueba si la había
+                self.breaker.release_probe()
+                raise
+            except Exception:
+                # Cualquier otro error libera la llamada de prueba y cuenta como fallo
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                retryable = method in IDEMPOTENT_METHODS
+                if not retryable or not self._should_retry(attempt, deadline_at, loop):
+                    return response
+
+            attempt += 1
+            span.set_attribute("http.retries", attempt)
+            logger.info("Reintentando %s %s%s (intento %d)", method, self.name, path, attempt)
+            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", path, **kwargs)
+
+    async def aclose(self):
+        """
+        Cierra el pool de conexiones del cliente.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _should_retry(self, attempt: int, deadline_at: float, loop) -> bool:
+        # Se reintenta solo si quedan intentos, tiempo y presupuesto
+        if attempt >= self.max_retries:
+            return False
+        if deadline_at - loop.time() <= self.backoff * (2 ** attempt):
+            return False
+        return self.retry_budget.try_acquire()
+
+
+# Registro global de clientes resilientes por nombre de servicio
+clients: Dict[str, ResilientClient] = {}
+
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """
+    Devuelve el estado de los circuit breakers de todos los clientes registrados.
+    """
+    return {name: client.breaker.snapshot() for name, client in clients.items()}
+
+
+async def close_clients():
+    """
+    Cierra los pools de conexiones de todos los clientes registrados.
+    """
+    for client in clients.values():
+        await client.aclose()
@@ -1,19 +1,32 @@
 # Herramientas de FastAPI para rutas, dependencias e interceptar errores
 import os
 from fastapi import APIRouter, Depends, HTTPException, status
-import httpx
 # Modelo de usuario definido con SQLAlchemy
 import models.models as UserModel
 # Esquema de datos del usuario para validación
 from schemas.schemas import UserSchema
 # Funciones para encriptar contraseñas, actualizar datos y valida el token JWT y obtiene al usuario actual
-from services.services import encrypt_password, verify_new_info
+from services.services import encrypt_password, verify_new_info, require_service_token
 # Dependencia de la base de datos
-from dependencies.dependencies import db_dependency
+from dependencies.dependencies import db_dependency, read_db_dependency
 from ws.websocket_notifier import notifier  # Importar el notificador
+# Cliente con circuit breaker, plazos y presupuesto de reintentos
+from resilience.resilience import ResilientClient
+# Conciliación por rangos entre la tabla users y la tabla login de Auth Service
+from reconciliation.reconciler import reconcile_logins
 import logging
 
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL")
+AUTH_SERVICE_TIMEOUT = float(os.getenv("AUTH_SERVICE_TIMEOUT", "2"))    # Timeout por intento (segundos)
+AUTH_SERVICE_DEADLINE = float(os.getenv("AUTH_SERVICE_DEADLINE", "5"))  # Plazo total incluyendo reintentos
+
+# Cliente compartido hacia el Auth Service
+auth_client = ResilientClient(
+    "auth-service",
+    AUTH_SERVICE_URL,
+    timeout=AUTH_SERVICE_TIMEOUT,
+    deadline=AUTH_SERVICE_DEADLINE,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -46,19 +59,18 @@ async def create_user(
     db.commit()
 
     # 2️⃣ Notificar al Auth Service para crear el login
-    async with httpx.AsyncClient() as client:
-        try:
-            auth_payload = {
-                "username": user.username,
-                "password": user.password,
-                "is_active": True
-            }
-            auth_response = await client.post(f"{AUTH_SERVICE_URL}/create_login", json=auth_payload)
-
-            if auth_response.status_code != 201:
-                logger.warning(f"Auth service respondió con error: {auth_response.status_code} - {auth_response.text}")
-        except Exception as e:
-            logger.error(f"No se pudo comunicar con Auth Service: {e}")
+    try:
+        auth_payload = {
+            "username": user.username,
+            "password": user.password,
+            "is_active": True
+        }
+        auth_response = await auth_client.post("/create_login", json=auth_payload)
+
+        if auth_response.status_code != 201:
+            logger.warning("Auth service respondió con error: %s - %s", auth_response.status_code, auth_response.text)
+    except Exception as e:
+        logger.error("No se pudo comunicar con Auth Service: %s", e)
 
     # 3️⃣ Enviar notificación WebSocket
     user_data = {
@@ -78,7 +90,7 @@ async def create_user(
 @users_router.get("/users/{user_id}", status_code=status.HTTP_200_OK, tags=["Users"])
 async def read_user_by_id(
     user_id: int, 
-    db: db_dependency, 
+    db: read_db_dependency, 
 ):
     """
     Obtiene un usuario por ID.\n
@@ -102,7 +114,7 @@ async def read_user_by_id(
 # Ruta: Obtener todos los usuarios (protegida)
 @users_router.get("/users", status_code=status.HTTP_200_OK, tags=["Users"])
 async def read_users(
-    db: db_dependency, 
+    db: read_db_dependency, 
 ):
     """
     Obtiene todos los usuarios.\n
@@ -146,19 +158,18 @@ async def update_user(
     db.commit()
     db.refresh(user)
     # 2️⃣ Notificar al Auth Service para crear el login
-    async with httpx.AsyncClient() as client:
-        try:
-            auth_payload = {
-                "username": user.username,
-                "password": user.password,
-                "is_active": True
-            }
-            auth_response = await client.put(f"{AUTH_SERVICE_URL}/update_login/{user.id}", json=auth_payload)
-
-            if auth_response.status_code != 200:
-                logger.warning(f"Auth service respondió con error: {auth_response.status_code} - {auth_response.text}")
-        except Exception as e:
-            logger.error(f"No se pudo comunicar con Auth Service: {e}")
+    try:
+        auth_payload = {
+            "username": user.username,
+            "password": user.password,
+            "is_active": True
+        }
+        auth_response = await auth_client.put(f"/update_login/{user.id}", json=auth_payload)
+
+        if auth_response.status_code != 200:
+            logger.warning("Auth service respondió con error: %s - %s", auth_response.status_code, auth_response.text)
+    except Exception as e:
+        logger.error("No se pudo comunicar con Auth Service: %s", e)
 
     # 3️⃣ Enviar notificación WebSocket
     user_data = {
@@ -196,3 +207,30 @@ def delete_user(
     db.delete(user)
     db.commit()
     return
+
+# Ruta: Conciliar la tabla users con la tabla login de Auth Service
+@users_router.post(
+    "/reconcile",
+    status_code=status.HTTP_200_OK,
+    tags=["Reconcile"],
+    dependencies=[Depends(require_service_token)],
+)
+async def reconcile(
+    db: db_dependency,
+    dry_run: bool = False,
+):
+    """
+    Compara users y login por rangos de IDs y repara las diferencias por lotes.\n
+    Args:\n
+        db (Session): Objeto de sesión de la base de datos.\n
+        dry_run (bool): Si es True, solo informa las diferencias.\n
+    Returns:\n
+        dict: Resumen de rangos comparados, filas reparadas y bytes transferidos.\n
+    Raises:\n
+        HTTPException: Si no se pudo completar la comunicación con Auth Service.
+    """
+    try:
+        return await reconcile_logins(db, dry_run=dry_run)
+    except Exception as e:
+        logger.error("No se pudo completar la conciliación con Auth Service: %s", e)
+        raise HTTPException(status_code=502, detail="No se pudo completar la conciliación con Auth Service")
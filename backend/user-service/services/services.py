@@ -3,8 +3,17 @@ import os
 from schemas.schemas import UserSchema
 # Librería bcrypt para el hash seguro de contraseñas
 import bcrypt
+# Span para medir el coste de bcrypt dentro de la traza de la petición
+from tracing.tracing import start_span
+# Herramientas de FastAPI para validar el token de las rutas internas
+from fastapi import Header, HTTPException, status
+# Comparación en tiempo constante del token entre servicios
+import hmac
+from typing import Optional
 
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL")
+# Token compartido con Auth Service para las rutas internas (conciliación)
+SERVICE_TOKEN = os.getenv("SERVICE_TOKEN")
 
 # Función para encriptar contraseñas antes de almacenarlas
 def encrypt_password(plain_password: str) -> str:
@@ -17,7 +26,8 @@ def encrypt_password(plain_password: str) -> str:
     Returns:
         str: Contraseña encriptada en formato string.
     """
-    hashed = bcrypt.hashpw(plain_password.encode('utf-8'), bcrypt.gensalt())
+    with start_span("bcrypt.hashpw"):
+        hashed = bcrypt.hashpw(plain_password.encode('utf-8'), bcrypt.gensalt())
     return hashed.decode('utf-8')
 
 # Función para actualizar los campos de un usuario si han sido modificados
@@ -38,3 +48,20 @@ def verify_new_info(user: UserSchema, updated_user: UserSchema):
             user.password = encrypt_password(value)
         else:
             setattr(user, field, value)
+
+# Función que protege las rutas internas entre servicios (conciliación)
+def require_service_token(x_service_token: Optional[str] = Header(None)):
+    """
+    Comprueba la cabecera X-Service-Token contra el token compartido SERVICE_TOKEN.
+    Si SERVICE_TOKEN no está configurado, las rutas internas quedan deshabilitadas.
+
+    Args:
+        x_service_token (str, opcional): Token enviado por el otro servicio.
+
+    Raises:
+        HTTPException: 403 si no hay token configurado, 401 si el token no coincide.
+    """
+    if not SERVICE_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Rutas internas deshabilitadas")
+    if not x_service_token or not hmac.compare_digest(x_service_token.encode("utf-8"), SERVICE_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de servicio inválido")
@@ -0,0 +1,69 @@
+# Permite importar los módulos del servicio (resilience, tracing, ...) desde las pruebas
+import importlib
+import os
+import sys
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, "user-service"))
+
+# Paquetes de primer nivel con el mismo nombre en ambos servicios
+SERVICE_PACKAGES = {
+    "database", "dependencies", "logs", "main", "middleware", "models", "reconciliation",
+    "resilience", "routers", "schemas", "services", "tracing", "ws",
+}
+
+
+def _service_modules():
+    return {name: module for name, module in sys.modules.items() if name.split(".")[0] in SERVICE_PACKAGES}
+
+
+def import_service(service: str, env: dict, *names: str) -> SimpleNamespace:
+    """
+    Importa módulos nuevos de un servicio con las variables de entorno indicadas.
+
+    Cada llamada crea módulos independientes (motores, sesiones y configuración
+    leída al importar), así que en una misma prueba pueden convivir User Service
+    y Auth Service con sus propias bases SQLite. Al terminar se restauran
+    sys.modules, sys.path y el entorno.
+
+    Args:
+        service (str): Carpeta del servicio ("user-service" o "auth-service").
+        env (dict): Variables de entorno a usar durante la importación.
+        *names (str): Módulos a importar, por ejemplo "routers.routers".
+
+    Returns:
+        SimpleNamespace: Módulos importados, accesibles por su último componente
+        (por ejemplo `routers` o `digests`).
+    """
+    saved_modules = _service_modules()
+    saved_env = dict(os.environ)
+    for name in saved_modules:
+        del sys.modules[name]
+    service_dir = os.path.join(BACKEND_DIR, service)
+    sys.path.insert(0, service_dir)
+    os.environ.update(env)
+    try:
+        return SimpleNamespace(**{name.split(".")[-1]: importlib.import_module(name) for name in names})
+    finally:
+        sys.path.remove(service_dir)
+        for name in _service_modules():
+            del sys.modules[name]
+        sys.modules.update(saved_modules)
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+def sqlite_env(tmp_path, name: str, **extra) -> dict:
+    # Variables mínimas para importar un servicio sobre un archivo SQLite propio
+    env = {
+        "DATABASE_URL": f"sqlite:///{tmp_path / name}.db",
+        "DB_REPLICA_URLS": "",
+        "SECRET_KEY": "test-secret",
+        "ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "5",
+        "SERVICE_TOKEN": "test-service-token",
+    }
+    env.update(extra)
+    return env
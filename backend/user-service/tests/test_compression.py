@@ -0,0 +1,87 @@
+# Pruebas de la negociación de codificación y de la cabecera Vary del middleware de compresión
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.testclient import TestClient
+from middleware.compression import CompressionMiddleware, CompressionRule, negotiate_encoding
+
+ROWS = [{"id": i, "username": f"user{i}", "email": f"user{i}@example.com"} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/users")
+    def users():
+        return ROWS
+
+    @app.get("/raw")
+    def raw():
+        return ROWS
+
+    @app.get("/cached")
+    def cached():
+        return JSONResponse(ROWS, headers={"Vary": "Origin"})
+
+    @app.get("/image")
+    def image():
+        return PlainTextResponse("x" * 4000, media_type="image/png")
+
+    app.add_middleware(CompressionMiddleware, rules=[CompressionRule(r"/raw", level=0)], minimum_size=100)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_negotiate_encoding_respects_weights():
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("br;q=0.5, gzip;q=0.9") == "gzip"
+
+
+def test_compressed_response_has_vary(client):
+    response = client.get("/users", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == ROWS
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip;q=0", ""])
+def test_uncompressed_response_still_varies(client, accept_encoding):
+    # Una caché no debe servir esta copia sin comprimir a quien sí acepta gzip
+    response = client.get("/users", headers={"Accept-Encoding": accept_encoding})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_existing_vary_is_merged(client):
+    for accept_encoding in ("gzip", "identity"):
+        response = client.get("/cached", headers={"Accept-Encoding": accept_encoding})
+        assert response.headers["vary"] == "Origin, Accept-Encoding"
+
+
+def test_no_vary_when_response_never_compresses(client):
+    # Ruta con compresión desactivada y tipo no comprimible: la respuesta no depende de Accept-Encoding
+    assert "vary" not in client.get("/raw", headers={"Accept-Encoding": "gzip"}).headers
+    assert "vary" not in client.get("/image", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_stats_count_bytes_and_cpu():
+    app = FastAPI()
+
+    @app.get("/users")
+    def users():
+        return ROWS
+
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    with TestClient(app) as test_client:
+        response = test_client.get("/users", headers={"Accept-Encoding": "gzip"})
+        middleware = app.middleware_stack
+        while not isinstance(middleware, CompressionMiddleware):
+            middleware = middleware.app
+    stats = middleware.stats
+    assert stats["responses"] == 1
+    assert stats["bytes_in"] == len(response.content)
+    assert stats["bytes_out"] == response.num_bytes_downloaded < stats["bytes_in"]
+    assert stats["cpu_seconds"] >= 0
@@ -0,0 +1,184 @@
+# Pruebas del limitador con prioridades y del middleware de descarte de carga
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from middleware.load_shedding import (
+    LoadSheddingMiddleware,
+    PRIORITY_CRITICAL,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    PriorityLimiter,
+    RouteLimit,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def settle():
+    # Deja correr a las tareas pendientes hasta que lleguen a la cola
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_reserved_slots_only_for_high_priority():
+    async def scenario():
+        limiter = PriorityLimiter("test", limit=3, max_queue=4, queue_timeout=0, reserved=1)
+        assert await limiter.acquire(PRIORITY_NORMAL)
+        assert await limiter.acquire(PRIORITY_LOW)
+        # El último cupo está reservado: normal y baja se rechazan, alta entra
+        assert not await limiter.acquire(PRIORITY_NORMAL)
+        assert not await limiter.acquire(PRIORITY_LOW)
+        assert await limiter.acquire(PRIORITY_HIGH)
+        assert not await limiter.acquire(PRIORITY_HIGH)
+        assert (limiter.in_use, limiter.rejected) == (3, 3)
+
+    run(scenario())
+
+
+def test_reserved_never_takes_every_slot():
+    limiter = PriorityLimiter("test", limit=1, max_queue=0, queue_timeout=0, reserved=4)
+    assert limiter.reserved == 0
+    assert run(limiter.acquire(PRIORITY_LOW))
+
+
+def test_queue_overflow_rejects_immediately():
+    async def scenario():
+        limiter = PriorityLimiter("test", limit=1, max_queue=1, queue_timeout=10)
+        assert await limiter.acquire(PRIORITY_NORMAL)
+        waiter = asyncio.create_task(limiter.acquire(PRIORITY_NORMAL))
+        await settle()
+        assert limiter.queued == 1
+
+        # Con la cola llena no se espera al timeout
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert not await limiter.acquire(PRIORITY_NORMAL)
+        assert loop.time() - started < 1
+        assert limiter.rejected == 1
+
+        # Al liberar, el cupo pasa directamente a la petición en cola
+        limiter.release()
+        assert await waiter
+        assert (limiter.in_use, limiter.queued) == (1, 0)
+
+    run(scenario())
+
+
+def test_queue_timeout_rejects_and_cleans_up():
+    async def scenario():
+        limiter = PriorityLimiter("test", limit=1, max_queue=2, queue_timeout=0.05)
+        assert await limiter.acquire(PRIORITY_NORMAL)
+        assert not await limiter.acquire(PRIORITY_NORMAL)
+        assert (limiter.in_use, limiter.queued, limiter.rejected) == (1, 0, 1)
+
+        # El waiter vencido no recibe el cupo liberado
+        limiter.release()
+        assert limiter.in_use == 0
+        assert await limiter.acquire(PRIORITY_NORMAL)
+
+    run(scenario())
+
+
+def test_higher_priority_waiter_is_served_first():
+    async def scenario():
+        limiter = PriorityLimiter("test", limit=1, max_queue=4, queue_timeout=10)
+        assert await limiter.acquire(PRIORITY_NORMAL)
+        order = []
+
+        async def wait(priority):
+            assert await limiter.acquire(priority)
+            order.append(priority)
+            limiter.release()
+
+        low = asyncio.create_task(wait(PRIORITY_LOW))
+        await settle()
+        high = asyncio.create_task(wait(PRIORITY_HIGH))
+        await settle()
+        limiter.release()
+        await asyncio.gather(low, high)
+        assert order == [PRIORITY_HIGH, PRIORITY_LOW]
+        assert (limiter.in_use, limiter.queued) == (0, 0)
+
+    run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        limiter = PriorityLimiter("test", limit=1, max_queue=1, queue_timeout=10)
+        assert await limiter.acquire(PRIORITY_NORMAL)
+        waiter = asyncio.create_task(limiter.acquire(PRIORITY_NORMAL))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert (limiter.in_use, limiter.queued, limiter.rejected) == (1, 0, 0)
+
+        # La cola vuelve a tener lugar y el cupo liberado no se pierde
+        limiter.release()
+        assert limiter.in_use == 0
+        assert await limiter.acquire(PRIORITY_NORMAL)
+
+    run(scenario())
+
+
+def test_cancelled_after_grant_returns_slot():
+    async def scenario():
+        limiter = PriorityLimiter("test", limit=1, max_queue=1, queue_timeout=10)
+        assert await limiter.acquire(PRIORITY_NORMAL)
+        waiter = asyncio.create_task(limiter.acquire(PRIORITY_NORMAL))
+        await settle()
+        # El cupo se transfiere y la tarea se cancela antes de reanudarse
+        limiter.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert (limiter.in_use, limiter.queued) == (0, 0)
+
+    run(scenario())
+
+
+def build_app(gate: asyncio.Event) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/work")
+    async def work():
+        await gate.wait()
+        return {}
+
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        routes=[RouteLimit("GET", r"/health", priority=PRIORITY_CRITICAL)],
+        limit=2,
+        max_queue=1,
+        queue_timeout=10,
+        reserved=0,
+    )
+    return app
+
+
+def test_middleware_returns_503_when_queue_is_full():
+    async def scenario():
+        gate = asyncio.Event()
+        app = build_app(gate)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # Dos peticiones ocupan los cupos y una tercera espera en la cola
+            busy = [asyncio.create_task(client.get("/work")) for _ in range(3)]
+            await settle()
+            response = await client.get("/work")
+            assert response.status_code == 503
+            assert response.headers["retry-after"] == "1"
+            # Las rutas críticas no pasan por el limitador
+            assert (await client.get("/health")).status_code == 200
+
+            gate.set()
+            assert [r.status_code for r in await asyncio.gather(*busy)] == [200, 200, 200]
+
+    run(scenario())
@@ -0,0 +1,47 @@
+# Pruebas del límite de repeticiones de los logs
+import logging
+from logs.logs import RateLimitFilter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_record(msg: str, level: int = logging.WARNING) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+
+def test_rate_limit_counts_suppressed_records():
+    clock = FakeClock()
+    limiter = RateLimitFilter(limit=2, interval=10, clock=clock)
+    assert [limiter.filter(make_record("fallo %s")) for _ in range(5)] == [True, True, False, False, False]
+    clock.now += 10
+    record = make_record("fallo %s")
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+
+
+def test_rate_limit_prunes_expired_windows():
+    clock = FakeClock()
+    limiter = RateLimitFilter(limit=2, interval=10, clock=clock)
+    for index in range(5000):
+        limiter.filter(make_record(f"mensaje {index}"))
+    clock.now += 10
+    limiter.filter(make_record("otro"))
+    # Solo queda la ventana vigente
+    assert list(limiter._windows) == [("test", logging.WARNING, "otro")]
+
+
+def test_rate_limit_bounds_distinct_messages():
+    clock = FakeClock()
+    limiter = RateLimitFilter(limit=1, interval=10, max_keys=100, clock=clock)
+    for index in range(5000):
+        limiter.filter(make_record(f"mensaje {index}"))
+    assert len(limiter._windows) == 100
+    # Se conservan las más recientes: las nuevas repeticiones siguen limitadas
+    assert not limiter.filter(make_record("mensaje 4999"))
+    assert limiter.filter(make_record("mensaje 0"))
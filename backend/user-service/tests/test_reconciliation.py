@@ -0,0 +1,217 @@
+# Pruebas de la conciliación users/login sobre dos bases SQLite locales
+import asyncio
+import hashlib
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from conftest import import_service, sqlite_env
+
+SERVICE_HEADERS = {"X-Service-Token": "test-service-token"}
+
+
+@pytest.fixture
+def auth(tmp_path):
+    # Auth Service con solo el router de conciliación sobre su propia base SQLite
+    svc = import_service(
+        "auth-service",
+        sqlite_env(tmp_path, "auth"),
+        "database.database",
+        "models.models",
+        "routers.routers",
+        "reconciliation.digests",
+    )
+    svc.models.Base.metadata.create_all(bind=svc.database.engine)
+    svc.app = FastAPI()
+    svc.app.include_router(svc.routers.reconcile_router)
+    yield svc
+    svc.database.engine.dispose()
+
+
+@pytest.fixture
+def users(tmp_path):
+    # Módulos de User Service sobre otra base SQLite
+    svc = import_service(
+        "user-service",
+        sqlite_env(tmp_path, "users"),
+        "database.database",
+        "models.models",
+        "reconciliation.digests",
+        "reconciliation.reconciler",
+        "resilience.resilience",
+    )
+    svc.models.Base.metadata.create_all(bind=svc.database.engine)
+    yield svc
+    svc.database.engine.dispose()
+
+
+def seed_users(svc, rows):
+    with svc.database.engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, email, username, password, is_active) VALUES (:id, :email, :username, :password, 1)"),
+            [{"id": i, "email": f"{name}@test", "username": name, "password": pw} for i, name, pw in rows],
+        )
+
+
+def seed_logins(svc, rows):
+    with svc.database.engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO login (id, username, password, is_active) VALUES (:id, :username, :password, 1)"),
+            [{"id": i, "username": name, "password": pw} for i, name, pw in rows],
+        )
+
+
+def logins(svc):
+    with svc.database.engine.connect() as conn:
+        return conn.execute(text("SELECT id, username, password FROM login ORDER BY id")).all()
+
+
+def test_split_range_edge_cases(users):
+    split_range = users.digests.split_range
+    assert split_range(0, 10, 3) == [(0, 4), (4, 8), (8, 10)]
+    # Más partes que IDs: un subrango por ID
+    assert split_range(0, 3, 16) == [(0, 1), (1, 2), (2, 3)]
+    assert split_range(5, 6, 4) == [(5, 6)]
+    assert split_range(5, 5, 4) == []
+    assert split_range(0, 10, 1) == [(0, 10)]
+    # Los subrangos cubren el rango original sin huecos ni solapes
+    parts = split_range(7, 1000, 16)
+    assert parts[0][0] == 7 and parts[-1][1] == 1000
+    assert all(left[1] == right[0] for left, right in zip(parts, parts[1:]))
+    with pytest.raises(ValueError):
+        split_range(0, 10, 0)
+
+
+def test_range_digests_ignore_rows_between_ranges(users):
+    seed_users(users, [(i, f"u{i}", f"h{i}") for i in list(range(1, 11)) + list(range(50, 61))])
+    ranges = [(0, 5), (20, 30), (50, 55)]
+    db = users.database.SessionLocal()
+    try:
+        before = users.digests.range_digests(db, users.models.User, ranges)
+        # Un rango sin filas tiene el resumen vacío
+        assert before[1] == hashlib.blake2b(digest_size=16).hexdigest()
+        assert len(set(before)) == 3
+
+        # Cambiar filas fuera de los rangos (6-10, 55-60) no altera los resúmenes
+        db.execute(text("UPDATE users SET password = 'x' WHERE id IN (7, 58)"))
+        db.commit()
+        assert users.digests.range_digests(db, users.models.User, ranges) == before
+
+        # Cambiar una fila dentro de un rango solo altera ese rango
+        db.execute(text("UPDATE users SET password = 'x' WHERE id = 52"))
+        db.commit()
+        after = users.digests.range_digests(db, users.models.User, ranges)
+        assert after[:2] == before[:2] and after[2] != before[2]
+    finally:
+        db.close()
+
+
+def test_digests_match_across_services(users, auth):
+    rows = [(i, f"u{i}", f"h{i}") for i in range(1, 40)]
+    seed_users(users, rows)
+    seed_logins(auth, rows)
+    ranges = [(0, 10), (10, 25), (25, 100)]
+    user_db, auth_db = users.database.SessionLocal(), auth.database.SessionLocal()
+    try:
+        assert users.digests.range_digests(user_db, users.models.User, ranges) == auth.digests.range_digests(
+            auth_db, auth.models.Login, ranges
+        )
+    finally:
+        user_db.close()
+        auth_db.close()
+
+
+def repair(client, upserts, deletes=()):
+    response = client.post(
+        "/reconcile/repair",
+        json={
+            "upserts": [{"id": i, "username": name, "password": pw} for i, name, pw in upserts],
+            "deletes": list(deletes),
+        },
+        headers=SERVICE_HEADERS,
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_repair_requires_service_token(auth):
+    with TestClient(auth.app) as client:
+        assert client.post("/reconcile/rows", json={"ranges": [[0, 10]]}).status_code == 401
+        response = client.post("/reconcile/rows", json={"ranges": [[0, 10]]}, headers={"X-Service-Token": "otro"})
+        assert response.status_code == 401
+
+
+def test_repair_swaps_two_usernames(auth):
+    seed_logins(auth, [(1, "b", "h1"), (2, "a", "h2")])
+    with TestClient(auth.app) as client:
+        result = repair(client, [(1, "a", "h1"), (2, "b", "h2")])
+    assert result == {"inserted": 0, "updated": 2, "deleted": 0, "failed": []}
+    assert logins(auth) == [(1, "a", "h1"), (2, "b", "h2")]
+
+
+def test_repair_rotates_usernames_across_batches(auth):
+    seed_logins(auth, [(1, "b", "h1"), (2, "c", "h2"), (3, "a", "h3")])
+    with TestClient(auth.app) as client:
+        # Primer lote: 3 cede "a" y queda con un username provisional hasta su lote
+        assert repair(client, [(1, "a", "h1")])["failed"] == []
+        assert logins(auth)[2][1].startswith(auth.routers.RELEASED_USERNAME_PREFIX)
+        assert repair(client, [(2, "b", "h2"), (3, "c", "h3")])["failed"] == []
+    assert logins(auth) == [(1, "a", "h1"), (2, "b", "h2"), (3, "c", "h3")]
+
+
+def test_repair_reports_rows_that_still_conflict(auth):
+    seed_logins(auth, [(1, "a", "h1")])
+    with TestClient(auth.app) as client:
+        # Dos filas del mismo lote piden el mismo username: solo la segunda falla
+        result = repair(client, [(1, "x", "h1"), (2, "x", "h2"), (3, "c", "h3")])
+    assert result["failed"] == [2]
+    assert logins(auth) == [(1, "x", "h1"), (3, "c", "h3")]
+
+
+def test_reconcile_dry_run_reports_without_writing(users, auth):
+    rows = [(i, f"u{i}", f"h{i}") for i in range(1, 301)]
+    seed_users(users, rows)
+    drifted = {i: (i, name, pw) for i, name, pw in rows}
+    drifted[5] = (5, "u5", "stale")       # contraseña desactualizada
+    del drifted[120]                      # falta en login
+    drifted[10], drifted[11] = (10, "u11", "h10"), (11, "u10", "h11")  # usernames intercambiados
+    drifted[400] = (400, "ghost", "h400")  # sobra en login
+    seed_logins(auth, drifted.values())
+    before = logins(auth)
+
+    client = users.resilience.ResilientClient(
+        "auth-service-test",
+        "http://auth",
+        timeout=5,
+        transport=httpx.ASGITransport(app=auth.app),
+        headers=SERVICE_HEADERS,
+    )
+
+    async def run(**kwargs):
+        db = users.database.SessionLocal()
+        try:
+            return await users.reconciler.reconcile_logins(db, client=client, fanout=4, leaf_size=16, **kwargs)
+        finally:
+            db.close()
+
+    report = asyncio.run(run(dry_run=True))
+    assert report["upserts"] == 4
+    assert report["deletes"] == 1
+    assert report["failed_ids"] == []
+    assert report["bytes_transferred"] > 0
+    assert logins(auth) == before
+
+    assert asyncio.run(run())["failed_ids"] == []
+    assert logins(auth) == sorted(rows)
+    report = asyncio.run(run(dry_run=True))
+    assert (report["mismatched_leaves"], report["upserts"], report["deletes"]) == (0, 0, 0)
+
+
+def test_reconcile_rejects_fanout_that_cannot_split(users):
+    async def run(**kwargs):
+        return await users.reconciler.reconcile_logins(None, **kwargs)
+
+    for kwargs in ({"fanout": 1}, {"fanout": 0}, {"leaf_size": 0}, {"batch_size": 0}):
+        with pytest.raises(ValueError):
+            asyncio.run(run(**kwargs))
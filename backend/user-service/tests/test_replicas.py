@@ -0,0 +1,133 @@
+# Pruebas de lecturas en réplicas con dos archivos SQLite locales (primario y réplicas)
+import time
+import bcrypt
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from starlette.requests import Request
+from conftest import import_service, sqlite_env
+
+
+def replica_env(tmp_path, name: str, replicas: int, **extra) -> dict:
+    urls = ",".join(f"sqlite:///{tmp_path / name}-replica{index}.db" for index in range(replicas))
+    return sqlite_env(tmp_path, f"{name}-primary", DB_REPLICA_URLS=urls, **extra)
+
+
+def make_request(method: str, client_host: str = "10.0.0.1") -> Request:
+    return Request({"type": "http", "method": method, "headers": [], "client": (client_host, 1234)})
+
+
+def open_session(dependency, request):
+    # Ejecuta la dependencia generadora como lo haría FastAPI y devuelve la sesión y su cierre
+    generator = dependency(request)
+    return next(generator), generator.close
+
+
+def database_file(session) -> str:
+    return session.get_bind().url.database
+
+
+@pytest.fixture
+def users(tmp_path):
+    svc = import_service(
+        "user-service",
+        replica_env(tmp_path, "users", replicas=2, READ_YOUR_WRITES_SECONDS="0.2"),
+        "database.database",
+        "dependencies.dependencies",
+    )
+    yield svc
+    for engine in (svc.database.engine, *svc.database.replica_engines):
+        engine.dispose()
+
+
+def test_replica_sessions_round_robin(users):
+    files = [database_file(users.database.ReplicaSessionLocal()) for _ in range(4)]
+    assert files[0] != files[1]
+    assert files[:2] == files[2:]
+    assert all("replica" in name for name in files)
+
+
+def test_read_your_writes_window(users):
+    primary = database_file(users.database.SessionLocal())
+
+    # Antes de escribir, las lecturas van a las réplicas
+    session, close = open_session(users.dependencies.get_read_db, make_request("GET"))
+    assert database_file(session) != primary
+    close()
+
+    # Una escritura fija las lecturas del mismo cliente al primario
+    session, close = open_session(users.dependencies.get_db, make_request("POST"))
+    close()
+    session, close = open_session(users.dependencies.get_read_db, make_request("GET"))
+    assert database_file(session) == primary
+    close()
+
+    # Otro cliente sigue leyendo de las réplicas
+    session, close = open_session(users.dependencies.get_read_db, make_request("GET", "10.0.0.2"))
+    assert database_file(session) != primary
+    close()
+
+    # Vencida la ventana, el cliente vuelve a las réplicas
+    time.sleep(0.5)
+    session, close = open_session(users.dependencies.get_read_db, make_request("GET"))
+    assert database_file(session) != primary
+    close()
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(4)).decode("utf-8")
+
+
+@pytest.fixture
+def auth(tmp_path):
+    # Auth Service con un primario y una réplica que no se replica sola (simula retraso)
+    svc = import_service(
+        "auth-service",
+        replica_env(tmp_path, "auth", replicas=1),
+        "database.database",
+        "models.models",
+        "dependencies.dependencies",
+        "routers.routers",
+    )
+    for engine in (svc.database.engine, *svc.database.replica_engines):
+        svc.models.Base.metadata.create_all(bind=engine)
+    app = FastAPI()
+    app.include_router(svc.routers.auth_router)
+    svc.client = TestClient(app)
+    yield svc
+    for engine in (svc.database.engine, *svc.database.replica_engines):
+        engine.dispose()
+
+
+def login(auth, username: str, password: str) -> int:
+    return auth.client.post("/login", data={"username": username, "password": password}).status_code
+
+
+def test_login_with_lagging_replica(auth):
+    old_hash = hash_password("old")
+    assert auth.client.post("/create_login", json={"username": "ana", "password": old_hash}).status_code == 201
+    # La réplica se pone al día con el alta y luego deja de replicar
+    with auth.database.replica_engines[0].begin() as conn:
+        conn.execute(text("INSERT INTO login (id, username, password, is_active) VALUES (1, 'ana', :pw, 1)"), {"pw": old_hash})
+
+    new_hash = hash_password("new")
+    assert auth.client.put("/update_login/1", json={"username": "ana", "password": new_hash}).status_code == 200
+
+    # Dentro de la ventana el login lee del primario
+    assert login(auth, "ana", "new") == 200
+    assert login(auth, "ana", "old") == 401
+
+    # Vencida la ventana, la réplica todavía tiene la contraseña vieja: se revalida en el primario
+    auth.dependencies._recent_writers.clear()
+    assert login(auth, "ana", "new") == 200
+    assert login(auth, "ana", "wrong") == 401
+
+    # Cambio de username: el viejo deja de existir aunque la réplica aún lo tenga
+    assert auth.client.put("/update_login/1", json={"username": "bea", "password": new_hash}).status_code == 200
+    assert login(auth, "bea", "new") == 200
+    assert login(auth, "ana", "new") == 404
+
+    auth.dependencies._recent_writers.clear()
+    assert login(auth, "bea", "new") == 200
+    assert login(auth, "nadie", "new") == 404
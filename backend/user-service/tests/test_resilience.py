@@ -0,0 +1,317 @@
+# Pruebas del cliente resiliente contra un servidor local que inyecta latencia y errores
+import asyncio
+import time
+import httpx
+import pytest
+from resilience.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientClient,
+    RetryBudget,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+)
+
+
+class StubServer:
+    """
+    Servidor HTTP mínimo sobre asyncio. Cada petición responde con el estado y
+    la latencia configurados en `status` y `delay`, y queda contada en `hits`.
+    """
+
+    def __init__(self):
+        self.status = 200
+        self.delay = 0.0
+        self.hits = 0
+        self._server = None
+        self._handlers = set()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        # Las respuestas con latencia pendientes no deben retrasar el cierre
+        for task in self._handlers:
+            task.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            self.hits += 1
+            await asyncio.sleep(self.delay)
+            writer.write(
+                f"HTTP/1.1 {self.status} X\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{{}}".encode()
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+
+class FakeClock:
+    """
+    Reloj manual para avanzar el tiempo del circuito y del presupuesto sin esperar.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_client(url: str, clock=None, **kwargs) -> ResilientClient:
+    # Circuito que se abre con 4 llamadas y un 50% de errores, y prueba a los 30 s del reloj
+    kwargs.setdefault(
+        "breaker",
+        CircuitBreaker("stub", minimum_calls=4, window_size=4, reset_timeout=30, clock=clock or FakeClock()),
+    )
+    kwargs.setdefault("timeout", 1.0)
+    kwargs.setdefault("backoff", 0.01)
+    return ResilientClient("stub", url, **kwargs)
+
+
+async def _open_circuit(client: ResilientClient, stub: StubServer):
+    # POST no se reintenta ante un 500: cada llamada es un único fallo
+    stub.status = 500
+    for _ in range(4):
+        await client.post("/x")
+
+
+def test_breaker_opens_at_threshold_and_fails_fast():
+    async def scenario():
+        async with StubServer() as stub:
+            client = make_client(stub.url)
+            stub.status = 500
+            for _ in range(3):
+                await client.post("/x")
+                assert client.breaker.state == STATE_CLOSED
+            await client.post("/x")
+            assert client.breaker.state == STATE_OPEN
+
+            # Mientras está abierto no se contacta al servicio
+            hits = stub.hits
+            with pytest.raises(CircuitOpenError):
+                await client.get("/x")
+            assert stub.hits == hits
+            assert client.breaker.snapshot()["rejected"] == 1
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_half_open_probe_success_closes_circuit():
+    async def scenario():
+        async with StubServer() as stub:
+            clock = FakeClock()
+            client = make_client(stub.url, clock=clock)
+            await _open_circuit(client, stub)
+            clock.advance(29)
+            with pytest.raises(CircuitOpenError):
+                await client.get("/x")
+            clock.advance(1)
+
+            stub.status = 200
+            response = await client.get("/x")
+            assert response.status_code == 200
+            assert client.breaker.state == STATE_CLOSED
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_half_open_probe_failure_reopens_circuit():
+    async def scenario():
+        async with StubServer() as stub:
+            clock = FakeClock()
+            client = make_client(stub.url, clock=clock)
+            await _open_circuit(client, stub)
+            clock.advance(30)
+
+            hits = stub.hits
+            response = await client.post("/x")
+            assert response.status_code == 500
+            assert stub.hits == hits + 1
+            assert client.breaker.state == STATE_OPEN
+            with pytest.raises(CircuitOpenError):
+                await client.get("/x")
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_cancelled_half_open_probe_releases_slot():
+    async def scenario():
+        async with StubServer() as stub:
+            clock = FakeClock()
+            client = make_client(stub.url, clock=clock)
+            await _open_circuit(client, stub)
+            clock.advance(30)
+
+            # La prueba se cancela desde fuera antes de recibir respuesta
+            stub.status, stub.delay = 200, 5.0
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.get("/x"), 0.2)
+            # La cancelación no es un fallo del servicio: sigue semiabierto con el cupo libre
+            assert client.breaker.state == STATE_HALF_OPEN
+
+            # Sin esperar a reset_timeout, la siguiente prueba sale y cierra el circuito
+            stub.delay = 0.0
+            assert (await client.get("/x")).status_code == 200
+            assert client.breaker.state == STATE_CLOSED
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_cancelled_calls_do_not_open_closed_circuit():
+    async def scenario():
+        async with StubServer() as stub:
+            client = make_client(stub.url)
+            stub.delay = 5.0
+            for _ in range(8):
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.get("/x"), 0.1)
+            assert client.breaker.state == STATE_CLOSED
+            assert client.breaker.snapshot()["calls_in_window"] == 0
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_stale_half_open_probe_is_rearmed():
+    clock = FakeClock()
+    breaker = CircuitBreaker("stub", minimum_calls=1, window_size=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+    # La prueba nunca informa su resultado: se rechaza hasta que vence reset_timeout
+    clock.advance(29)
+    assert not breaker.allow_request()
+    clock.advance(1)
+    assert breaker.allow_request()
+
+
+def test_per_attempt_timeout_allows_retry_within_deadline():
+    async def scenario():
+        async with StubServer() as stub:
+            client = make_client(stub.url, timeout=0.3, deadline=10.0, max_retries=3)
+            stub.delay = 5.0
+
+            async def recover():
+                # El servicio se recupera mientras el primer intento espera
+                await asyncio.sleep(0.05)
+                stub.delay = 0.0
+
+            asyncio.create_task(recover())
+            started = time.monotonic()
+            response = await client.get("/x")
+            assert response.status_code == 200
+            assert stub.hits == 2
+            # Sin timeout por intento se habrían esperado los 5 s del primero
+            assert time.monotonic() - started < 3.0
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_overall_deadline_caps_retries():
+    async def scenario():
+        async with StubServer() as stub:
+            client = make_client(stub.url, timeout=0.2, deadline=0.5, max_retries=30)
+            stub.delay = 10.0
+            started = time.monotonic()
+            with pytest.raises(httpx.TimeoutException):
+                await client.get("/x")
+            # Sin plazo global, 31 intentos de 0,2 s habrían tardado más de 6 s
+            assert time.monotonic() - started < 3.0
+            assert stub.hits <= 4
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_post_not_retried_on_timeout():
+    async def scenario():
+        async with StubServer() as stub:
+            client = make_client(stub.url, timeout=0.2, deadline=5.0, max_retries=3)
+            stub.delay = 5.0
+            with pytest.raises(httpx.TimeoutException):
+                await client.post("/x", json={"id": 1})
+            await asyncio.sleep(0.3)
+            assert stub.hits == 1
+            await client.aclose()
+
+    run(scenario())
+
+
+def test_post_retried_on_connect_error():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        if len(calls) < 3:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(201)
+
+    async def scenario():
+        client = make_client("http://stub", transport=httpx.MockTransport(handler), max_retries=3)
+        response = await client.post("/x", json={"id": 1})
+        assert response.status_code == 201
+        assert calls == ["POST", "POST", "POST"]
+        await client.aclose()
+
+    run(scenario())
+
+
+def test_retry_budget_exhaustion_stops_retries():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    async def scenario():
+        # Presupuesto de un único reintento en la ventana y circuito que no se abre
+        budget = RetryBudget(ratio=0.0, min_per_second=0.1, ttl=10.0, clock=FakeClock())
+        client = make_client(
+            "http://stub",
+            transport=httpx.MockTransport(handler),
+            max_retries=3,
+            retry_budget=budget,
+            breaker=CircuitBreaker("stub", minimum_calls=100),
+        )
+        assert (await client.get("/x")).status_code == 503
+        assert len(calls) == 2
+        assert (await client.get("/x")).status_code == 503
+        assert len(calls) == 3
+        await client.aclose()
+
+    run(scenario())
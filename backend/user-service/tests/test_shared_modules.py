@@ -0,0 +1,21 @@
+# Cada servicio lleva su propia copia de los módulos comunes (igual que database o
+# dependencies); esta prueba evita que las copias de User y Auth Service se separen.
+import os
+import pytest
+from conftest import BACKEND_DIR
+
+SHARED_MODULES = [
+    "database/database.py",
+    "logs/logs.py",
+    "middleware/compression.py",
+    "middleware/load_shedding.py",
+    "reconciliation/digests.py",
+    "tracing/tracing.py",
+]
+
+
+@pytest.mark.parametrize("module", SHARED_MODULES)
+def test_shared_module_copies_are_identical(module):
+    with open(os.path.join(BACKEND_DIR, "user-service", module), "rb") as user_copy:
+        with open(os.path.join(BACKEND_DIR, "auth-service", module), "rb") as auth_copy:
+            assert user_copy.read() == auth_copy.read(), f"{module} difiere entre user-service y auth-service"
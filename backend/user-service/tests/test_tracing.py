@@ -0,0 +1,35 @@
+# Pruebas del middleware de trazado y de la configuración del muestreo
+import math
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from tracing.tracing import TracingMiddleware, parse_sample_rate
+
+
+def test_parse_sample_rate_validates_range():
+    assert parse_sample_rate(None) == 1.0
+    assert parse_sample_rate("") == 1.0
+    assert parse_sample_rate("0") == 0.0
+    assert parse_sample_rate("0.25") == 0.25
+    assert parse_sample_rate("1") == 1.0
+    # Valores fuera de [0, 1] o no numéricos vuelven al valor por defecto
+    for value in ("-0.1", "1.5", "abc", "nan", "inf"):
+        rate = parse_sample_rate(value)
+        assert rate == 1.0 and not math.isnan(rate)
+
+
+def test_response_carries_traceresponse_not_traceparent():
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    app.add_middleware(TracingMiddleware)
+    trace_id, parent_id = "0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331"
+    with TestClient(app) as client:
+        response = client.get("/ping", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    assert "traceparent" not in response.headers
+    version, returned_trace, span_id, flags = response.headers["traceresponse"].split("-")
+    # Misma traza, span propio del servidor y la decisión de muestreo del llamador
+    assert (version, returned_trace, flags) == ("00", trace_id, "01")
+    assert len(span_id) == 16 and span_id != parent_id
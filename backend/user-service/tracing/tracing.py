@@ -0,0 +1,436 @@
+# contextvars mantiene el span activo por petición (también en el pool de hilos)
+import contextvars
+import json
+import queue
+import random
+import threading
+import time
+# urllib evita depender de un cliente HTTP extra para exportar a OTLP
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+# Carga variables de entorno desde el archivo .env
+from dotenv import load_dotenv
+import logging
+import os
+
+# Carga las variables del archivo .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def parse_sample_rate(value: Optional[str]) -> float:
+    """
+    Interpreta TRACE_SAMPLE_RATE; un valor vacío, no numérico o fuera de [0, 1] usa 1.0.
+
+    Args:
+        value (Optional[str]): Valor de la variable de entorno.
+
+    Returns:
+        float: Fracción de trazas nuevas que se registran.
+    """
+    if not value:
+        return 1.0
+    try:
+        rate = float(value)
+    except ValueError:
+        rate = -1.0
+    # "nan" no cumple ninguna comparación, por eso se valida el rango en positivo
+    if not 0.0 <= rate <= 1.0:
+        logger.warning("TRACE_SAMPLE_RATE inválido (%r), se usa 1.0", value)
+        return 1.0
+    return rate
+
+
+# Configuración del trazado desde variables de entorno
+TRACE_SAMPLE_RATE = parse_sample_rate(os.getenv("TRACE_SAMPLE_RATE"))  # Fracción de trazas nuevas que se registran
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")                    # Archivo JSON lines de salida
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT")                # Colector OTLP/HTTP (ej: http://localhost:4318)
+TRACE_STATEMENT_MAX_LENGTH = 500                                      # Caracteres máximos de una sentencia SQL
+
+# Tipos de span y su equivalente numérico en OTLP
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+# Span activo en el contexto actual
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Operación medida dentro de una traza (petición, consulta SQL, llamada HTTP, etc.).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        if self.sampled:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            _exporter.export(self)
+
+    def traceparent(self) -> str:
+        # Cabecera W3C Trace Context para propagar la traza a otros servicios
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "service": _config["service_name"],
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def parse_traceparent(header: Optional[str]):
+    """
+    Extrae (trace_id, parent_id, sampled) de una cabecera traceparent.
+
+    Returns:
+        tuple | None: Contexto remoto o None si la cabecera no es válida.
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def current_span() -> Optional[Span]:
+    """
+    Devuelve el span activo o None si no hay traza en curso.
+    """
+    return _current_span.get()
+
+
+def new_span(name: str, kind: str = "internal", attributes=None, remote=None) -> Span:
+    """
+    Crea un span hijo del span activo, de un contexto remoto o raíz de una traza nueva.
+    La decisión de muestreo se hereda del padre; solo las trazas nuevas se muestrean.
+    """
+    parent = current_span()
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+    elif parent is not None:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id = f"{random.getrandbits(128):032x}"
+        parent_id = None
+        sampled = random.random() < _config["sample_rate"]
+    return Span(name, trace_id, parent_id, sampled, kind, attributes)
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", attributes=None):
+    """
+    Abre un span como span activo durante el bloque `with`.
+
+    Args:
+        name (str): Nombre de la operación.
+        kind (str): internal, server o client.
+        attributes (dict, opcional): Atributos iniciales.
+    """
+    span = new_span(name, kind, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Añade la cabecera traceparent del span activo a un diccionario de cabeceras.
+    """
+    headers = dict(headers or {})
+    span = current_span()
+    if span is not None:
+        headers["traceparent"] = span.traceparent()
+    return headers
+
+
+class TracingMiddleware:
+    """
+    Middleware ASGI que crea un span de servidor por petición, continuando la
+    traza recibida en la cabecera traceparent si existe.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        remote = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                remote = parse_traceparent(value.decode("latin-1"))
+                break
+
+        span = new_span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+            remote=remote,
+        )
+        token = _current_span.set(span)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                # Devuelve el contexto en traceresponse (W3C Trace Context nivel 2) para que el
+                # cliente pueda correlacionar la respuesta; traceparent es solo de peticiones
+                headers = list(message.get("headers", []))
+                headers.append((b"traceresponse", span.traceparent().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+
+def instrument_engine(engine):
+    """
+    Registra eventos de SQLAlchemy para medir cada sentencia SQL como un span.
+
+    Args:
+        engine: Motor de SQLAlchemy a instrumentar.
+    """
+    # Importación local para que el módulo no dependa de SQLAlchemy si no se usa
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_span() is None:
+            return
+        span = new_span(
+            "db.query",
+            kind="client",
+            attributes={
+                "db.system": engine.dialect.name,
+                "db.statement": statement[:TRACE_STATEMENT_MAX_LENGTH],
+            },
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        if spans:
+            span = spans.pop()
+            span.record_error(exception_context.original_exception)
+            span.end()
+
+
+class _Exporter:
+    """
+    Exporta los spans terminados desde un hilo en segundo plano para no añadir
+    E/S a la petición. Si la cola se llena, los spans se descartan.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 256, interval: float = 1.0):
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def export(self, span: Span):
+        if not (_config["export_file"] or _config["otlp_endpoint"]):
+            return
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        """
+        Exporta de inmediato los spans pendientes (por ejemplo, al apagar el servicio).
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Span]):
+        with self._write_lock:
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Span]):
+        try:
+            if _config["export_file"]:
+                with open(_config["export_file"], "a", encoding="utf-8") as output:
+                    for span in batch:
+                        output.write(json.dumps(span.to_dict(), default=str) + "\n")
+            if _config["otlp_endpoint"]:
+                self._send_otlp(batch)
+        except Exception as e:
+            logger.error("No se pudieron exportar %d spans: %s", len(batch), e)
+
+    def _send_otlp(self, batch: List[Span]):
+        # Formato OTLP/HTTP JSON (https://opentelemetry.io/docs/specs/otlp/)
+        spans = []
+        for span in batch:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": SPAN_KINDS.get(span.kind, 1),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", _config["service_name"])]},
+                "scopeSpans": [{"scope": {"name": "microservices.tracing"}, "spans": spans}],
+            }]
+        }
+        request = urllib.request.Request(
+            _config["otlp_endpoint"].rstrip("/") + "/v1/traces",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    # Convierte un atributo al formato tipado de OTLP
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+# Configuración activa del trazado
+_config = {
+    "service_name": "unknown-service",
+    "sample_rate": TRACE_SAMPLE_RATE,
+    "export_file": TRACE_EXPORT_FILE,
+    "otlp_endpoint": TRACE_OTLP_ENDPOINT,
+}
+
+# Exportador global
+_exporter = _Exporter()
+
+
+def configure_tracing(service_name: str, engines=(), sample_rate: Optional[float] = None):
+    """
+    Configura el nombre del servicio y la instrumentación de las bases de datos.
+
+    Args:
+        service_name (str): Nombre con el que se exportan los spans.
+        engines (list): Motores de SQLAlchemy a instrumentar.
+        sample_rate (float, opcional): Fracción de trazas nuevas a registrar.
+    """
+    _config["service_name"] = service_name
+    if sample_rate is not None:
+        _config["sample_rate"] = sample_rate
+    for engine in engines:
+        instrument_engine(engine)
+
+
+def shutdown_tracing():
+    """
+    Exporta los spans pendientes antes de apagar el servicio.
+    """
+    _exporter.flush()
@@ -1,7 +1,9 @@
-import httpx
+import os
 import json
 import logging
 from typing import Dict, Any, Optional
+# Cliente con circuit breaker, plazos y presupuesto de reintentos
+from resilience.resilience import ResilientClient
 
 logger = logging.getLogger(__name__)
 
@@ -10,9 +12,20 @@ class WebSocketNotifier:
     Cliente para enviar notificaciones al servidor WebSocket de Go
     """
     
-    def __init__(self, websocket_server_url: str = "http://localhost:8080"):
+    def __init__(
+        self,
+        websocket_server_url: str = "http://localhost:8080",
+        timeout: float = 1.0,
+        deadline: Optional[float] = None,
+    ):
         self.base_url = websocket_server_url
-        self.timeout = 5.0
+        self.timeout = timeout
+        self.client = ResilientClient(
+            "websocket-hub",
+            websocket_server_url,
+            timeout=timeout,
+            deadline=deadline,
+        )
     
     async def notify_user_created(self, user_data: Dict[str, Any]) -> bool:
         """
@@ -25,24 +38,22 @@ class WebSocketNotifier:
             bool: True si la notificación fue exitosa, False en caso contrario
         """
         try:
-            url = f"{self.base_url}/api/notify/user-created"
-            
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    url,
-                    json=user_data,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code == 200:
-                    logger.info(f"Notificación de usuario creado enviada exitosamente: {user_data}")
-                    return True
-                else:
-                    logger.error(f"Error enviando notificación: {response.status_code} - {response.text}")
-                    return False
-                    
+            response = await self.client.post(
+                "/api/notify/user-created",
+                json=user_data,
+                headers={"Content-Type": "application/json"}
+            )
+
+            if response.status_code == 200:
+                # Solo el ID y en DEBUG: este log se genera en cada alta o edición de usuario
+                logger.debug("Notificación de usuario creado enviada exitosamente: id=%s", user_data.get("id"))
+                return True
+            else:
+                logger.error("Error enviando notificación: %s - %s", response.status_code, response.text)
+                return False
+
         except Exception as e:
-            logger.error(f"Error conectando con servidor WebSocket: {str(e)}")
+            logger.error("Error conectando con servidor WebSocket: %s", e)
             return False
     
     async def check_websocket_health(self) -> bool:
@@ -50,15 +61,16 @@ class WebSocketNotifier:
         Verifica si el servidor WebSocket está disponible
         """
         try:
-            url = f"{self.base_url}/health"
-            
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url)
-                return response.status_code == 200
-                
+            response = await self.client.get("/health")
+            return response.status_code == 200
+
         except Exception as e:
-            logger.error(f"Error verificando salud del servidor WebSocket: {str(e)}")
+            logger.error("Error verificando salud del servidor WebSocket: %s", e)
             return False
 
 # Instancia global del notificador
-notifier = WebSocketNotifier()
+notifier = WebSocketNotifier(
+    os.getenv("WEBSOCKET_SERVER_URL", "http://localhost:8080"),
+    timeout=float(os.getenv("WEBSOCKET_SERVER_TIMEOUT", "1")),
+    deadline=float(os.getenv("WEBSOCKET_SERVER_DEADLINE", "2")),
+)
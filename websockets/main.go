@@ -1,11 +1,16 @@
 package main
 
 import (
+	"bytes"
+	"crypto/rand"
+	"encoding/hex"
 	"encoding/json"
 	"fmt"
 	"log"
+	mathrand "math/rand"
 	"net/http"
 	"os"
+	"strconv"
 	"strings"
 	"sync"
 	"time"
@@ -49,6 +54,36 @@ type Hub struct {
 	mutex      sync.RWMutex
 }
 
+// Contexto de traza W3C recibido en la cabecera traceparent
+type TraceContext struct {
+	TraceID  string
+	ParentID string
+	Sampled  bool
+}
+
+// Span exportado en el mismo formato JSON lines que los servicios FastAPI
+type SpanRecord struct {
+	Service    string                 `json:"service"`
+	TraceID    string                 `json:"trace_id"`
+	SpanID     string                 `json:"span_id"`
+	ParentID   string                 `json:"parent_id,omitempty"`
+	Name       string                 `json:"name"`
+	Kind       string                 `json:"kind"`
+	StartNs    int64                  `json:"start_ns"`
+	EndNs      int64                  `json:"end_ns"`
+	DurationMs float64                `json:"duration_ms"`
+	Attributes map[string]interface{} `json:"attributes"`
+	Error      *string                `json:"error"`
+}
+
+// Exportador de spans: escribe en segundo plano para no bloquear los handlers
+type SpanExporter struct {
+	path         string
+	otlpEndpoint string
+	client       *http.Client
+	spans        chan SpanRecord
+}
+
 // Upgrader para WebSocket con configuración CORS
 var upgrader = websocket.Upgrader{
 	CheckOrigin: func(r *http.Request) bool {
@@ -121,6 +156,192 @@ func (h *Hub) run() {
 	}
 }
 
+// Genera un identificador aleatorio en hexadecimal de n bytes
+func randomHex(n int) string {
+	b := make([]byte, n)
+	if _, err := rand.Read(b); err != nil {
+		return strings.Repeat("0", n*2)
+	}
+	return hex.EncodeToString(b)
+}
+
+// Interpreta la cabecera traceparent (version-traceid-parentid-flags)
+func parseTraceparent(header string) (TraceContext, bool) {
+	parts := strings.Split(strings.TrimSpace(header), "-")
+	if len(parts) < 4 || len(parts[1]) != 32 || len(parts[2]) != 16 {
+		return TraceContext{}, false
+	}
+	if parts[1] == strings.Repeat("0", 32) || parts[2] == strings.Repeat("0", 16) {
+		return TraceContext{}, false
+	}
+	flags, err := hex.DecodeString(parts[3])
+	if err != nil || len(flags) == 0 {
+		return TraceContext{}, false
+	}
+	return TraceContext{TraceID: parts[1], ParentID: parts[2], Sampled: flags[0]&1 == 1}, true
+}
+
+// Crear exportador de spans; sin archivo ni colector OTLP no exporta nada
+func newSpanExporter(path string, otlpEndpoint string) *SpanExporter {
+	exporter := &SpanExporter{
+		path:         path,
+		otlpEndpoint: strings.TrimRight(otlpEndpoint, "/"),
+		client:       &http.Client{Timeout: 5 * time.Second},
+		spans:        make(chan SpanRecord, 1024),
+	}
+	if exporter.enabled() {
+		go exporter.run()
+	}
+	return exporter
+}
+
+// Indica si hay algún destino configurado para los spans
+func (e *SpanExporter) enabled() bool {
+	return e.path != "" || e.otlpEndpoint != ""
+}
+
+// Encola un span; si la cola está llena se descarta para no frenar el handler
+func (e *SpanExporter) export(span SpanRecord) {
+	if !e.enabled() {
+		return
+	}
+	select {
+	case e.spans <- span:
+	default:
+	}
+}
+
+// Exporta los spans encolados por lotes al archivo JSON lines y al colector OTLP
+func (e *SpanExporter) run() {
+	for span := range e.spans {
+		// Agrupa lo que ya esté en cola con el span recibido
+		batch := []SpanRecord{span}
+		for pending := len(e.spans); pending > 0; pending-- {
+			batch = append(batch, <-e.spans)
+		}
+		if e.path != "" {
+			e.writeFile(batch)
+		}
+		if e.otlpEndpoint != "" {
+			if err := e.sendOTLP(batch); err != nil {
+				log.Printf("No se pudieron exportar %d spans a OTLP: %v", len(batch), err)
+			}
+		}
+	}
+}
+
+// Escribe el lote en el archivo JSON lines
+func (e *SpanExporter) writeFile(batch []SpanRecord) {
+	file, err := os.OpenFile(e.path, os.O_APPEND|os.O_CREATE|os.O_WRONLY, 0644)
+	if err != nil {
+		log.Printf("Error abriendo archivo de trazas: %v", err)
+		return
+	}
+	defer file.Close()
+	encoder := json.NewEncoder(file)
+	for _, span := range batch {
+		encoder.Encode(span)
+	}
+}
+
+// Tipos de span de OTLP (igual que SPAN_KINDS en los servicios FastAPI)
+var otlpSpanKinds = map[string]int{"internal": 1, "server": 2, "client": 3}
+
+// Convierte un atributo al formato tipado de OTLP
+func otlpAttribute(key string, value interface{}) map[string]interface{} {
+	var typed map[string]interface{}
+	switch v := value.(type) {
+	case bool:
+		typed = map[string]interface{}{"boolValue": v}
+	case int:
+		typed = map[string]interface{}{"intValue": strconv.Itoa(v)}
+	case int64:
+		typed = map[string]interface{}{"intValue": strconv.FormatInt(v, 10)}
+	case float64:
+		typed = map[string]interface{}{"doubleValue": v}
+	default:
+		typed = map[string]interface{}{"stringValue": fmt.Sprint(v)}
+	}
+	return map[string]interface{}{"key": key, "value": typed}
+}
+
+// Envía el lote al colector en formato OTLP/HTTP JSON (https://opentelemetry.io/docs/specs/otlp/)
+func (e *SpanExporter) sendOTLP(batch []SpanRecord) error {
+	spans := make([]map[string]interface{}, 0, len(batch))
+	for _, span := range batch {
+		attributes := make([]map[string]interface{}, 0, len(span.Attributes))
+		for key, value := range span.Attributes {
+			attributes = append(attributes, otlpAttribute(key, value))
+		}
+		status := map[string]interface{}{"code": 1}
+		if span.Error != nil {
+			status = map[string]interface{}{"code": 2, "message": *span.Error}
+		}
+		kind, ok := otlpSpanKinds[span.Kind]
+		if !ok {
+			kind = 1
+		}
+		otlpSpan := map[string]interface{}{
+			"traceId":           span.TraceID,
+			"spanId":            span.SpanID,
+			"name":              span.Name,
+			"kind":              kind,
+			"startTimeUnixNano": strconv.FormatInt(span.StartNs, 10),
+			"endTimeUnixNano":   strconv.FormatInt(span.EndNs, 10),
+			"attributes":        attributes,
+			"status":            status,
+		}
+		if span.ParentID != "" {
+			otlpSpan["parentSpanId"] = span.ParentID
+		}
+		spans = append(spans, otlpSpan)
+	}
+
+	payload := map[string]interface{}{
+		"resourceSpans": []map[string]interface{}{{
+			"resource": map[string]interface{}{
+				"attributes": []map[string]interface{}{otlpAttribute("service.name", batch[0].Service)},
+			},
+			"scopeSpans": []map[string]interface{}{{
+				"scope": map[string]interface{}{"name": "microservices.tracing"},
+				"spans": spans,
+			}},
+		}},
+	}
+	body, err := json.Marshal(payload)
+	if err != nil {
+		return err
+	}
+	response, err := e.client.Post(e.otlpEndpoint+"/v1/traces", "application/json", bytes.NewReader(body))
+	if err != nil {
+		return err
+	}
+	defer response.Body.Close()
+	if response.StatusCode >= 300 {
+		return fmt.Errorf("el colector respondió %d", response.StatusCode)
+	}
+	return nil
+}
+
+// Exportador global de spans (configurado en main)
+var spanExporter = newSpanExporter("", "")
+
+// Fracción de trazas nuevas que se registran (configurada en main con TRACE_SAMPLE_RATE)
+var traceSampleRate = 1.0
+
+// Leer la fracción de muestreo; valores vacíos o inválidos dejan 1.0
+func parseSampleRate(value string) float64 {
+	if value == "" {
+		return 1.0
+	}
+	rate, err := strconv.ParseFloat(value, 64)
+	if err != nil || rate < 0 || rate > 1 {
+		log.Printf("TRACE_SAMPLE_RATE inválido (%q), se usa 1.0", value)
+		return 1.0
+	}
+	return rate
+}
+
 // Obtener número de conexiones activas
 func (h *Hub) getConnectionCount() int {
 	h.mutex.RLock()
@@ -226,19 +447,62 @@ func (h *Hub) wsHandler(w http.ResponseWriter, r *http.Request) {
 
 // Handler para recibir notificaciones de creación de usuario desde FastAPI
 func (h *Hub) userCreatedHandler(w http.ResponseWriter, r *http.Request) {
+	// Continúa la traza recibida desde FastAPI o inicia una nueva
+	start := time.Now()
+	trace, ok := parseTraceparent(r.Header.Get("traceparent"))
+	if !ok {
+		trace = TraceContext{TraceID: randomHex(16), Sampled: mathrand.Float64() < traceSampleRate}
+	}
+	spanID := randomHex(8)
+	status := http.StatusOK
+	var spanErr *string
+	defer func() {
+		if !trace.Sampled {
+			return
+		}
+		end := time.Now()
+		spanExporter.export(SpanRecord{
+			Service:    "websocket-hub",
+			TraceID:    trace.TraceID,
+			SpanID:     spanID,
+			ParentID:   trace.ParentID,
+			Name:       "POST /api/notify/user-created",
+			Kind:       "server",
+			StartNs:    start.UnixNano(),
+			EndNs:      end.UnixNano(),
+			DurationMs: float64(end.Sub(start).Microseconds()) / 1000,
+			Attributes: map[string]interface{}{
+				"http.method":      r.Method,
+				"http.status_code": status,
+				"ws.clients":       h.getConnectionCount(),
+			},
+			Error: spanErr,
+		})
+	}()
+
+	flags := "00"
+	if trace.Sampled {
+		flags = "01"
+	}
+	w.Header().Set("traceresponse", fmt.Sprintf("00-%s-%s-%s", trace.TraceID, spanID, flags))
+
 	if r.Method != http.MethodPost {
-		http.Error(w, "Método no permitido", http.StatusMethodNotAllowed)
+		status = http.StatusMethodNotAllowed
+		http.Error(w, "Método no permitido", status)
 		return
 	}
 
 	var user User
 	if err := json.NewDecoder(r.Body).Decode(&user); err != nil {
-		log.Printf("Error decodificando usuario: %v", err)
-		http.Error(w, "Error en formato JSON", http.StatusBadRequest)
+		log.Printf("[trace_id=%s] Error decodificando usuario: %v", trace.TraceID, err)
+		status = http.StatusBadRequest
+		message := err.Error()
+		spanErr = &message
+		http.Error(w, "Error en formato JSON", status)
 		return
 	}
 
-	log.Printf("Usuario creado recibido: %+v", user)
+	log.Printf("[trace_id=%s] Usuario creado recibido: %+v", trace.TraceID, user)
 
 	// Crear mensaje para broadcast
 	message := Message{
@@ -283,6 +547,17 @@ func main() {
 	hub := newHub()
 	go hub.run()
 
+	// Cargar archivo .env
+	errEnv := godotenv.Load()
+
+	if errEnv != nil {
+		log.Fatalf("Error al cargar el archivo .env")
+	}
+
+	// Exportar spans a JSON lines y/o a un colector OTLP si están configurados
+	spanExporter = newSpanExporter(os.Getenv("TRACE_EXPORT_FILE"), os.Getenv("TRACE_OTLP_ENDPOINT"))
+	traceSampleRate = parseSampleRate(os.Getenv("TRACE_SAMPLE_RATE"))
+
 	// Crear router
 	router := mux.NewRouter()
 
@@ -294,13 +569,6 @@ func main() {
 	router.HandleFunc("/api/stats", hub.statsHandler).Methods("GET")
 	router.HandleFunc("/health", healthHandler).Methods("GET")
 
-	// Cargar archivo .env
-	errEnv := godotenv.Load()
-
-	if errEnv != nil {
-		log.Fatalf("Error al cargar el archivo .env")
-	}
-
 	allowedOrigins := strings.Split(os.Getenv("ALLOWED_ORIGINS"), ",")
 
 	// Configurar CORS